@@ -1,12 +1,40 @@
 #!/usr/bin/env python3
-import os, sys, time, json, traceback
-from collections import deque
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from urllib import request, parse
+import os, sys, time, logging, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+import requests
+from requests.adapters import HTTPAdapter
 from watchdog.observers import Observer
 from watchdog.events import PatternMatchingEventHandler
 from dotenv import load_dotenv
 from config_loader import load_config
+from log_setup import configure_logging
+
+try:
+    from orjson import loads as json_loads, JSONDecodeError
+except ImportError:  # stdlib fallback; also accepts bytes
+    from json import loads as json_loads, JSONDecodeError
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+if simdjson is not None:
+    # On-Demand parsing: only the keys we touch get materialized. A single
+    # parser is reused so its internal buffers survive across lines; the
+    # documents it returns must be released before the next parse.
+    _PARSER = simdjson.Parser()
+    parse_record = _PARSER.parse
+    PARSE_ERRORS = (ValueError, RuntimeError)
+    _OBJECT_TYPES = (dict, simdjson.Object)
+    _ARRAY_TYPES = (list, tuple, simdjson.Array)
+else:
+    parse_record = json_loads
+    PARSE_ERRORS = (JSONDecodeError,)
+    _OBJECT_TYPES = (dict,)
+    _ARRAY_TYPES = (list, tuple)
 
 load_dotenv()
 config = load_config()
@@ -14,62 +42,64 @@ config = load_config()
 script_config = config.get_script_config('big_liquidation')
 ROOT = os.path.expanduser(os.getenv("HIP_FILLS_ROOT", "~/hl/data/node_fills_by_block/hourly"))
 USD_THRESHOLD = Decimal(str(script_config['usd_threshold']))
+# float twin for the per-liquidation comparison; Decimal is only needed for display
+USD_THRESHOLD_FLOAT = float(script_config['usd_threshold'])
 READ_EXISTING_AT_START = script_config['read_existing_at_start']
 READ_NEW_FILES_FROM_START = script_config['read_new_files_from_start']
+BATCH_INTERVAL_SECONDS = script_config.get('batch_interval_seconds', 0.1)
+MAX_OPEN_FILES = 64
+READ_CHUNK_BYTES = 1 << 20
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 DEVELOPER_TELEGRAM_BOT_TOKEN = os.getenv("DEVELOPER_TELEGRAM_BOT_TOKEN")
 DEVELOPER_TELEGRAM_CHAT_ID = os.getenv("DEVELOPER_TELEGRAM_CHAT_ID")
 
-ALLOWED_COINS = set(config.symbols['allowed_liquidation_coins'])
+ALLOWED_COINS = frozenset(sys.intern(c) for c in config.symbols['allowed_liquidation_coins'])
 
-def now():
-    return time.strftime("%H:%M:%S")
+logger = logging.getLogger("big_liquidation")
 
-def log(msg):
-    print(f"[{now()}] {msg}", flush=True)
+# Keep-alive pool to api.telegram.org shared by both alert channels
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=1))
+
+# Alerts are sent off the watchdog dispatch thread so a slow Telegram
+# round-trip never stalls file tailing.
+_ALERT_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tg-alert")
 
 def send_telegram_alert(text: str) -> bool:
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        log("TELEGRAM credentials missing; skipping alert.")
+        logger.warning("TELEGRAM credentials missing; skipping alert.")
         return False
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    data = parse.urlencode({"chat_id": TELEGRAM_CHAT_ID, "text": text}).encode()
     try:
-        with request.urlopen(request.Request(url, data=data), timeout=10) as resp:
-            ok = (200 <= resp.status < 300)
-            if not ok:
-                log(f"Telegram response status: {resp.status}")
-            return ok
+        resp = _SESSION.post(url, json={"chat_id": TELEGRAM_CHAT_ID, "text": text}, timeout=10)
     except Exception as e:
-        log(f"Market alert send failed: {e}")
+        logger.warning("Market alert send failed: %s", e)
         return False
+    if not resp.ok:
+        logger.warning("Telegram response status: %s", resp.status_code)
+    return resp.ok
 
 def send_developer_alert(text: str) -> bool:
     if not DEVELOPER_TELEGRAM_BOT_TOKEN or not DEVELOPER_TELEGRAM_CHAT_ID:
         return False
     url = f"https://api.telegram.org/bot{DEVELOPER_TELEGRAM_BOT_TOKEN}/sendMessage"
-    data = parse.urlencode({"chat_id": DEVELOPER_TELEGRAM_CHAT_ID, "text": text}).encode()
     try:
-        with request.urlopen(request.Request(url, data=data), timeout=10) as resp:
-            return (200 <= resp.status < 300)
+        return _SESSION.post(url, json={"chat_id": DEVELOPER_TELEGRAM_CHAT_ID, "text": text}, timeout=10).ok
     except Exception as e:
-        log(f"Developer alert send failed: {e}")
+        logger.warning("Developer alert send failed: %s", e)
         return False
 
-def _to_decimal(x):
-    try:
-        return Decimal(str(x))
-    except (InvalidOperation, ValueError, TypeError):
-        return None
+_QUANT = Decimal("0.01")
 
 def _fmt_usd(d: Decimal) -> str:
-    q = d.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    return f"${q:,.2f}"
+    return f"${d.quantize(_QUANT, rounding=ROUND_HALF_UP):,.2f}"
+
+_USD_THRESHOLD_FMT = _fmt_usd(USD_THRESHOLD)
 
 def extract_liquidations_from_record(rec):
-    if isinstance(rec, dict) and "liquidatedUser" in rec and "method" in rec:
+    if isinstance(rec, _OBJECT_TYPES) and "liquidatedUser" in rec and "method" in rec:
         yield {
             "time": rec.get("time"),
             "local_time": rec.get("local_time"),
@@ -89,11 +119,11 @@ def extract_liquidations_from_record(rec):
     evs = rec.get("events") or []
     for ev in evs:
         try:
-            e1 = ev[1] if isinstance(ev, (list, tuple)) and len(ev) > 1 else None
-            if not isinstance(e1, dict):
+            e1 = ev[1] if isinstance(ev, _ARRAY_TYPES) and len(ev) > 1 else None
+            if not isinstance(e1, _OBJECT_TYPES):
                 continue
             liq = e1.get("liquidation")
-            if not isinstance(liq, dict):
+            if not isinstance(liq, _OBJECT_TYPES):
                 continue
             yield {
                 "time": e1.get("time"),
@@ -111,33 +141,42 @@ def extract_liquidations_from_record(rec):
         except Exception:
             continue
 
+def _notional(liq):
+    try:
+        return float(liq["px"]) * float(liq["sz"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
 def should_alert(liq):
+    """Return (alert, kind, notional); notional is None when px/sz are unusable."""
     method = (liq.get("method") or "").lower()
-    log(f"      should_alert check: method='{method}'")
+    logger.debug("      should_alert check: method='%s'", method)
 
     if method == "backstop":
-        log(f"      Backstop liquidation detected - will alert")
-        return True, "backstop"
+        logger.debug("      Backstop liquidation detected - will alert")
+        return True, "backstop", _notional(liq)
 
     if method == "market":
-        px = _to_decimal(liq.get("px"))
-        sz = _to_decimal(liq.get("sz"))
-        log(f"      Market liquidation: px={px}, sz={sz}")
-
-        if px is None or sz is None:
-            log(f"      Invalid px/sz values - no alert")
-            return False, None
-
-        notional = px * sz
-        threshold_met = notional > USD_THRESHOLD
-        log(f"      Notional: {_fmt_usd(notional)} vs threshold {_fmt_usd(USD_THRESHOLD)} - threshold_met={threshold_met}")
-        return threshold_met, "market"
-
-    log(f"      Unknown method '{method}' - no alert")
-    return False, None
-
-def compose_message(liq, kind):
-    # required fields
+        notional = _notional(liq)
+        if notional is None:
+            logger.debug("      Invalid px/sz values - no alert")
+            return False, None, None
+        logger.debug("      Market liquidation: px=%s, sz=%s", liq["px"], liq["sz"])
+
+        threshold_met = notional > USD_THRESHOLD_FLOAT
+        logger.debug("      Notional: $%.2f vs threshold $%.2f - threshold_met=%s", notional, USD_THRESHOLD_FLOAT, threshold_met)
+        return threshold_met, "market", notional
+
+    logger.debug("      Unknown method '%s' - no alert", method)
+    return False, None, None
+
+_MSG_HEADERS = {"backstop": "Liquidation alert: backstop (ADL occurred on the exchange)"}
+_MSG_TMPL = (
+    "{header}{method}{coin}\npx: {px}\nsz: {sz}{notional}{user}{hash}{block}{block_time}"
+)
+
+def compose_message(liq, kind, notional=None):
+    # notional comes pre-computed from should_alert; None omits the line
     px = liq.get("px")
     sz = liq.get("sz")
     user = liq.get("liquidatedUser")
@@ -147,36 +186,54 @@ def compose_message(liq, kind):
     btime = liq.get("block_time")
     method = liq.get("method")
 
-    # compute notional if possible
-    notional = None
-    px_d = _to_decimal(px)
-    sz_d = _to_decimal(sz)
-    if px_d is not None and sz_d is not None:
-        notional = px_d * sz_d
-
-    lines = []
-    if kind == "backstop":
-        lines.append("Liquidation alert: backstop (ADL occurred on the exchange)")
-    else:
-        lines.append("Liquidation alert")
-
-    if method:
-        lines.append(f"method: {method}")
-    if coin:
-        lines.append(f"coin: {coin}")
-    lines.append(f"px: {px}")
-    lines.append(f"sz: {sz}")
-    if notional is not None:
-        lines.append(f"notional: {_fmt_usd(notional)} (threshold {_fmt_usd(USD_THRESHOLD)})")
-    if user:
-        lines.append(f"user: {user}")
-    if txh:
-        lines.append(f"hash: {txh}")
-    if block is not None:
-        lines.append(f"block: {block}")
-    if btime:
-        lines.append(f"block_time: {btime}")
-    return "\n".join(lines)
+    # One template pass; absent optional fields collapse to empty strings
+    return _MSG_TMPL.format(
+        header=_MSG_HEADERS.get(kind, "Liquidation alert"),
+        method=f"\nmethod: {method}" if method else "",
+        coin=f"\ncoin: {coin}" if coin else "",
+        px=px,
+        sz=sz,
+        notional=(
+            f"\nnotional: {_fmt_usd(Decimal(notional))} (threshold {_USD_THRESHOLD_FMT})"
+            if notional is not None else ""
+        ),
+        user=f"\nuser: {user}" if user else "",
+        hash=f"\nhash: {txh}" if txh else "",
+        block=f"\nblock: {block}" if block is not None else "",
+        block_time=f"\nblock_time: {btime}" if btime else "",
+    )
+
+def _scan_files(d):
+    """Yield (path, size) for every file under d, reusing scandir's cached stat."""
+    logger.debug("DIR %s", d)
+    try:
+        with os.scandir(d) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    yield from _scan_files(e.path)
+                elif e.is_file():
+                    try:
+                        yield e.path, e.stat().st_size
+                    except FileNotFoundError:
+                        continue
+    except FileNotFoundError:
+        return
+
+def _pread_to_eof(fd: int, off: int) -> bytes:
+    """Read from off to EOF; a read shorter than the chunk size means EOF."""
+    parts = []
+    while True:
+        piece = os.pread(fd, READ_CHUNK_BYTES, off)
+        parts.append(piece)
+        off += len(piece)
+        if len(piece) < READ_CHUNK_BYTES:
+            return b"".join(parts)
+
+def _file_size(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
 
 class TailHandler(PatternMatchingEventHandler):
     def __init__(self, root: str):
@@ -184,171 +241,244 @@ class TailHandler(PatternMatchingEventHandler):
         self.root = os.path.abspath(root)
         self.offsets = {}
         self.buffers = {}
-        self.seen_keys = set()
-        self.seen_order = deque(maxlen=20000)  # LRU for (hash, method)
-
-        log(f"initial scan under {self.root}")
-        for dp, _, files in os.walk(self.root):
-            log(f"DIR {dp}")
-            for fn in files:
-                p = os.path.join(dp, fn)
-                if not os.path.isfile(p):
-                    continue
-                try:
-                    size = os.path.getsize(p)
-                except FileNotFoundError:
-                    continue
-                start = 0 if READ_EXISTING_AT_START else size
-                self.offsets[p] = start
-                self.buffers[p] = ""
-                log(f"  register {p} size={size} start_offset={start}")
+        self.seen = OrderedDict()  # LRU of alerted (hash, method)
+        self._seen_cap = 20000
+        # Modify events only mark a path dirty; drain_dirty() reads each dirty
+        # path to EOF once per tick, coalescing bursts of small appends.
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._fds = OrderedDict()  # path -> fd, most recently read last
+
+        logger.info("initial scan under %s", self.root)
+        for p, size in _scan_files(self.root):
+            start = 0 if READ_EXISTING_AT_START else size
+            self.offsets[p] = start
+            self.buffers[p] = bytearray()
+            logger.debug("  register %s size=%d start_offset=%d", p, size, start)
+
+    def _fd_for(self, path: str) -> int:
+        fd = self._fds.get(path)
+        if fd is None:
+            fd = self._fds[path] = os.open(path, os.O_RDONLY)
+            if len(self._fds) > MAX_OPEN_FILES:
+                _, old_fd = self._fds.popitem(last=False)
+                os.close(old_fd)
+        else:
+            self._fds.move_to_end(path)
+        return fd
+
+    def _close_fd(self, path: str):
+        fd = self._fds.pop(path, None)
+        if fd is not None:
+            os.close(fd)
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
 
     def _read_new_lines(self, path: str):
         try:
             last_off = self.offsets.get(path, 0)
             try:
-                size = os.path.getsize(path)
+                fd = self._fd_for(path)
             except FileNotFoundError:
-                log(f"  disappeared: {path}")
+                logger.info("  disappeared: %s", path)
                 return
-            if size < last_off:
-                log(f"  truncate/rotation detected {path} {last_off}->{size}; reset to 0")
-                last_off = 0
-            with open(path, "r", encoding="utf-8", errors="replace") as f:
-                f.seek(last_off)
-                chunk = f.read()
-                new_off = f.tell()
-                self.offsets[path] = new_off
-                if new_off != last_off:
-                    log(f"  read {path}: {last_off}->{new_off} bytes={len(chunk)}")
+            # Steady state is a single pread per dirty path; the size is only
+            # consulted when nothing new was read, to detect truncation.
+            chunk = _pread_to_eof(fd, last_off)
+            if not chunk:
+                size = os.fstat(fd).st_size
+                if size < last_off:
+                    logger.info("  truncate/rotation detected %s %d->%d; reset to 0", path, last_off, size)
+                    last_off = 0
+                    chunk = _pread_to_eof(fd, 0)
+            new_off = last_off + len(chunk)
+            self.offsets[path] = new_off
+            if new_off != last_off:
+                logger.debug("  read %s: %d->%d bytes=%d", path, last_off, new_off, len(chunk))
         except Exception as e:
-            log(f"  read error {path}: {e}")
+            logger.warning("  read error %s: %s", path, e)
             return
 
-        buf = self.buffers.get(path, "")
-        data = buf + (chunk or "")
-        if not data:
+        buf = self.buffers.get(path)
+        if buf is None:
+            buf = self.buffers[path] = bytearray()
+        if chunk:
+            buf.extend(chunk)
+        # everything up to the last newline is complete; the rest stays buffered
+        cut = buf.rfind(b"\n")
+        if cut < 0:
             return
-
-        lines = data.splitlines()
-        if not data.endswith(("\n", "\r")):
-            self.buffers[path] = lines[-1] if lines else data
-            lines = lines[:-1] if lines else []
-        else:
-            self.buffers[path] = ""
-
-        for line in lines:
-            yield line
+        to_parse = bytes(buf[:cut])
+        del buf[:cut + 1]
+        yield from to_parse.split(b"\n")
 
     def _maybe_alert(self, liq, source_path):
-        do, kind = should_alert(liq)
-        log(f"    Alert decision: should_alert={do}, kind={kind}")
+        txh = liq.get("hash")
+        key = (txh, liq.get("method"))
+        if txh is not None and key in self.seen:
+            self.seen.move_to_end(key)
+            logger.debug("    Duplicate liquidation %s - already alerted", txh)
+            return
+
+        do, kind, notional = should_alert(liq)
+        logger.debug("    Alert decision: should_alert=%s, kind=%s", do, kind)
 
         if not do:
-            log(f"    No alert needed for liquidation (method={liq.get('method')}, threshold check failed or not backstop)")
+            logger.debug("    No alert needed for liquidation (method=%s, threshold check failed or not backstop)", liq.get("method"))
             return
         
-        coin = liq.get("coin")
+        # interned so the membership test resolves on identity
+        coin = sys.intern(liq.get("coin") or "")
         if coin not in ALLOWED_COINS:
-            log(f"    Skipping liquidation for coin '{coin}' (not in allowed list)")
+            logger.debug("    Skipping liquidation for coin '%s' (not in allowed list)", coin)
             return
 
-        log(f"    Composing alert message for {kind} liquidation")
-        msg = compose_message(liq, kind)
-        log(f"    Sending telegram alert: {msg[:100]}...")
+        logger.debug("    Composing alert message for %s liquidation", kind)
+        msg = compose_message(liq, kind, notional)
+        logger.debug("    Sending telegram alert: %.100s...", msg)
+
+        fut = _ALERT_POOL.submit(send_telegram_alert, msg)
+        fut.add_done_callback(
+            lambda f: logger.info("alert %s (%s)", "sent" if not f.exception() and f.result() else "FAILED", source_path)
+        )
 
-        ok = send_telegram_alert(msg)
-        log(f"alert {'sent' if ok else 'FAILED'} ({source_path})")
+        # recorded at dispatch time; the send itself completes asynchronously
+        if txh is not None:
+            self.seen[key] = None
+            if len(self.seen) > self._seen_cap:
+                self.seen.popitem(last=False)
 
-        # keep LRU size in sync with set
-        while len(self.seen_keys) > self.seen_order.maxlen:
-            old = self.seen_order.popleft()
-            self.seen_keys.discard(old)
+    def drain_dirty(self):
+        """Process every path modified since the previous call."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            for path in dirty:
+                self._process_path(path)
 
     def _process_path(self, path: str):
-        if not os.path.isfile(path):
-            return
         for line in self._read_new_lines(path):
             s = line.strip()
             if not s:
                 continue
-            if not (s.startswith("{") or s.startswith("[")):
+            if not (s.startswith(b"{") or s.startswith(b"[")):
                 # logs that are not JSON lines are skipped
                 continue
+            # Both record shapes carry "liquidation" or "liquidatedUser"; records
+            # without either substring cannot alert, so skip them unparsed.
+            if b"liquidat" not in s:
+                continue
             try:
-                rec = json.loads(s)
-            except json.JSONDecodeError:
-                # accumulate for multi-line JSON
-                self.buffers[path] = self.buffers.get(path, "") + s
+                rec = parse_record(s)
+            except PARSE_ERRORS:
+                # Fill files are NDJSON; a bad line is dropped, never buffered
+                logger.warning("bad json line in %s", path)
                 continue
 
-            # Log block number for every record processed
-            block_num = rec.get("block_number")
-            if block_num is not None:
-                log(f"Processing block {block_num}")
-
             try:
-                liquidations_found = 0
-                for liq in extract_liquidations_from_record(rec):
-                    liquidations_found += 1
-                    log(f"  Found liquidation: user={liq.get('liquidatedUser')}, method={liq.get('method')}, px={liq.get('px')}, sz={liq.get('sz')}, coin={liq.get('coin')}")
-                    self._maybe_alert(liq, path)
-                if liquidations_found > 0:
-                    log(f"  Total liquidations found in record: {liquidations_found}")
-            except Exception:
-                log(f"  error while extracting/alerting from {path}")
-                traceback.print_exc()
+                self._process_record(rec, path)
+            finally:
+                # simdjson documents pin the shared parser until released
+                del rec
+
+    def _process_record(self, rec, path: str):
+        # Log block number for every record processed
+        block_num = rec.get("block_number")
+        if block_num is not None:
+            logger.debug("Processing block %s", block_num)
+
+        try:
+            liquidations_found = 0
+            for liq in extract_liquidations_from_record(rec):
+                liquidations_found += 1
+                logger.debug("  Found liquidation: user=%(liquidatedUser)s, method=%(method)s, px=%(px)s, sz=%(sz)s, coin=%(coin)s", liq)
+                self._maybe_alert(liq, path)
+            if liquidations_found > 0:
+                logger.debug("  Total liquidations found in record: %d", liquidations_found)
+        except Exception:
+            logger.exception("  error while extracting/alerting from %s", path)
 
     def on_created(self, event):
-        size = os.path.getsize(event.src_path) if os.path.exists(event.src_path) else 0
+        size = _file_size(event.src_path)
         start = 0 if READ_NEW_FILES_FROM_START else size
-        self.offsets[event.src_path] = start
-        self.buffers[event.src_path] = ""
-        log(f"NEW file {event.src_path} size={size} offset={start}")
-        if READ_NEW_FILES_FROM_START:
-            self._process_path(event.src_path)
+        with self._lock:
+            self._close_fd(event.src_path)
+            self.offsets[event.src_path] = start
+            self.buffers[event.src_path] = bytearray()
+            if READ_NEW_FILES_FROM_START:
+                self._dirty.add(event.src_path)
+        logger.info("NEW file %s size=%d offset=%d", event.src_path, size, start)
 
     def on_modified(self, event):
-        if event.src_path not in self.offsets:
-            size = os.path.getsize(event.src_path) if os.path.exists(event.src_path) else 0
-            self.offsets[event.src_path] = size
-            self.buffers[event.src_path] = ""
-            log(f"late-register {event.src_path} size={size} offset={size}")
-        self._process_path(event.src_path)
+        with self._lock:
+            if event.src_path not in self.offsets:
+                size = _file_size(event.src_path)
+                self.offsets[event.src_path] = size
+                self.buffers[event.src_path] = bytearray()
+                logger.info("late-register %s size=%d offset=%d", event.src_path, size, size)
+            self._dirty.add(event.src_path)
 
     def on_moved(self, event):
         old = event.src_path
         new = event.dest_path
-        off = self.offsets.pop(old, 0)
-        buf = self.buffers.pop(old, "")
-        self.offsets[new] = off
-        self.buffers[new] = buf
-        log(f"moved {old} -> {new} carry_offset={off} carry_buf={len(buf)}")
+        with self._lock:
+            off = self.offsets.pop(old, 0)
+            buf = self.buffers.pop(old, bytearray())
+            self.offsets[new] = off
+            self.buffers[new] = buf
+            fd = self._fds.pop(old, None)
+            if fd is not None:
+                self._fds[new] = fd
+            if old in self._dirty:
+                self._dirty.discard(old)
+                self._dirty.add(new)
+        logger.info("moved %s -> %s carry_offset=%d carry_buf=%d", old, new, off, len(buf))
+
+    def on_deleted(self, event):
+        path = event.src_path
+        with self._lock:
+            # Lines appended since the last drain are still readable through
+            # a cached fd; read them before dropping the file's state
+            if path in self.offsets:
+                self._process_path(path)
+            self._close_fd(path)
+            self._dirty.discard(path)
+            self.offsets.pop(path, None)
+            self.buffers.pop(path, None)
 
 def main():
+    configure_logging()
     root = ROOT
     if not os.path.isdir(root):
-        log(f"Not found: {root}")
+        logger.error("Not found: %s", root)
         sys.exit(1)
-    log(f"Monitoring recursively under: {root}")
-    log(f"Tail existing files from {'start' if READ_EXISTING_AT_START else 'EOF'}; new files from {'start' if READ_NEW_FILES_FROM_START else 'EOF'}")
+    logger.info("Monitoring recursively under: %s", root)
+    logger.info("Tail existing files from %s; new files from %s",
+                "start" if READ_EXISTING_AT_START else "EOF",
+                "start" if READ_NEW_FILES_FROM_START else "EOF")
     handler = TailHandler(root)
     observer = Observer()
     observer.schedule(handler, path=root, recursive=True)
     observer.start()
     try:
         while True:
-            time.sleep(1.0)
+            time.sleep(BATCH_INTERVAL_SECONDS)
+            handler.drain_dirty()
     except KeyboardInterrupt:
         send_developer_alert("big_liquidation.py: Stopped by user (Ctrl+C)")
-        log("stopping")
+        logger.info("stopping")
         observer.stop()
     except Exception as e:
         send_developer_alert(f"big_liquidation.py: Crashed with error: {e}")
-        log(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         observer.stop()
         raise
     observer.join()
+    handler.close()
+    # let queued alerts drain before exiting
+    _ALERT_POOL.shutdown(wait=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,15 +1,36 @@
 #!/usr/bin/env python3
 import os
-import json
 import asyncio
 import signal
+import time
 import requests
 import contextlib
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timezone
 import websockets
 from dotenv import load_dotenv
 from config_loader import load_config
 
+try:
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # stdlib fallback
+    from json import loads as json_loads, dumps as json_dumps
+
+try:
+    import uvloop  # optional libuv-backed event loop
+except ImportError:
+    uvloop = None
+
+try:
+    import numpy as np
+except ImportError:  # optional; batches are filtered trade by trade
+    np = None
+
 load_dotenv()
 config = load_config()
 
@@ -21,6 +42,12 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 DEVELOPER_TELEGRAM_BOT_TOKEN = os.getenv("DEVELOPER_TELEGRAM_BOT_TOKEN")
 DEVELOPER_TELEGRAM_CHAT_ID = os.getenv("DEVELOPER_TELEGRAM_CHAT_ID")
 THRESHOLD = float(os.getenv("THRESHOLD", script_config.get('threshold', 10000)))
+# Every monitored coin shares one connection; per-coin thresholds override THRESHOLD
+COIN_SYMBOLS = config.symbols.get('monitored_coins', [COIN_SYMBOL])
+THRESHOLDS = {
+    coin: float(script_config.get('thresholds', {}).get(coin, THRESHOLD))
+    for coin in COIN_SYMBOLS
+}
 
 if NETWORK == "mainnet":
     WSS_URL = "wss://api.hyperliquid.xyz/ws"
@@ -34,18 +61,28 @@ if missing:
 
 print(f"Using {NETWORK} network: {WSS_URL}")
 
-SUBSCRIBE_PAYLOAD = {
-    "method": "subscribe",
-    "subscription": {
-        "type": "trades",
-        "coin": COIN_SYMBOL
-    },
-}
+# Sent as text frames; the server does not accept binary subscribe frames.
+SUBSCRIBE_MESSAGES = [
+    json_dumps({
+        "method": "subscribe",
+        "subscription": {
+            "type": "trades",
+            "coin": coin
+        },
+    })
+    for coin in COIN_SYMBOLS
+]
+
+# Keep-alive pool to api.telegram.org shared by both alert channels
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=1))
 
 PING_INTERVAL_SEC = script_config['ping_interval_seconds']
 RECONNECT_BASE_DELAY = script_config['reconnect_base_delay']
 RECONNECT_MAX_DELAY = script_config['reconnect_max_delay']
 MAX_TRADE_AGE_SECONDS = script_config['max_trade_age_seconds']
+# Below this batch size NumPy's setup costs more than the Python loop
+VECTORIZE_MIN_BATCH = 16
 
 
 def ts_to_iso(ts):
@@ -60,7 +97,7 @@ def send_telegram_alert(message: str):
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
     try:
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = _SESSION.post(url, json=payload, timeout=10)
         resp.raise_for_status()
         print("Market alert sent.")
     except Exception as e:
@@ -72,23 +109,15 @@ def send_developer_alert(message: str):
     url = f"https://api.telegram.org/bot{DEVELOPER_TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {"chat_id": DEVELOPER_TELEGRAM_CHAT_ID, "text": message}
     try:
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = _SESSION.post(url, json=payload, timeout=10)
         resp.raise_for_status()
         print("Developer alert sent.")
     except Exception as e:
         print("Failed to send developer alert:", e)
 
 
-async def send_heartbeats(ws):
-    try:
-        while True:
-            await asyncio.sleep(PING_INTERVAL_SEC)
-            try:
-                await ws.ping()
-            except Exception:
-                return
-    except asyncio.CancelledError:
-        return
+def threshold_for(coin):
+    return THRESHOLDS.get(coin, THRESHOLD)
 
 
 def format_trade(trade):
@@ -112,7 +141,7 @@ def format_trade(trade):
             f"Buyer: {buyer}\n"
             f"Seller: {seller}\n"
             f"Time: {iso_time}\n"
-            f"Threshold: ${THRESHOLD:,.2f}"
+            f"Threshold: ${threshold_for(coin):,.2f}"
         )
         return alert_msg, notional
     except Exception as e:
@@ -121,75 +150,98 @@ def format_trade(trade):
         return None, 0
 
 
+def select_large_trades(trades):
+    """Drop sub-threshold trades from big batches in one vectorized pass.
+
+    Small batches, and batches with a malformed price or size, are returned
+    unchanged so format_trade handles and reports them one by one.
+    """
+    if np is None or len(trades) < VECTORIZE_MIN_BATCH:
+        return trades
+    n = len(trades)
+    try:
+        pxs = np.fromiter((float(t["px"]) for t in trades), dtype=np.float64, count=n)
+        szs = np.fromiter((float(t["sz"]) for t in trades), dtype=np.float64, count=n)
+    except (KeyError, TypeError, ValueError):
+        return trades
+    thresholds = np.fromiter(
+        (threshold_for(t.get("coin", COIN_SYMBOL)) for t in trades), dtype=np.float64, count=n
+    )
+    return [trades[i] for i in np.flatnonzero(pxs * szs >= thresholds)]
+
+
 async def stream_trades():
     reconnect_delay = RECONNECT_BASE_DELAY
+    # Telegram sends run on the default executor so a slow POST never
+    # holds up WebSocket frame processing.
+    loop = asyncio.get_running_loop()
 
     while True:
         try:
             print(f"Connecting to {WSS_URL}...")
-            async with websockets.connect(WSS_URL, ping_interval=None, ping_timeout=None) as ws:
-                # Subscribe to trade events
-                await ws.send(json.dumps(SUBSCRIBE_PAYLOAD))
-                print(f"Subscribed: {json.dumps(SUBSCRIBE_PAYLOAD)}")
-
-                # Start heartbeat task
-                heartbeat_task = asyncio.create_task(send_heartbeats(ws))
+            # websockets' built-in keepalive pings the server and closes the
+            # connection if no pong arrives within ping_timeout.
+            async with websockets.connect(
+                WSS_URL,
+                ping_interval=PING_INTERVAL_SEC,
+                ping_timeout=PING_INTERVAL_SEC * 2,
+            ) as ws:
+                # Subscribe to trade events for every monitored coin
+                for message in SUBSCRIBE_MESSAGES:
+                    await ws.send(message)
+                    print(f"Subscribed: {message}")
                 reconnect_delay = RECONNECT_BASE_DELAY
 
-                try:
-                    # Process incoming messages
-                    async for raw in ws:
-                        try:
-                            msg = json.loads(raw)
-                        except Exception:
-                            print("Raw non-JSON message:", raw)
-                            continue
-
-                        trades = None
-                        if isinstance(msg, dict):
-                            if "data" in msg and isinstance(msg["data"], list):
-                                trades = msg["data"]
-                            elif "trades" in msg and isinstance(msg["trades"], list):
-                                trades = msg["trades"]
-
-                        if not trades:
-                            # Log subscription acknowledgment
-                            if msg.get("method") == "subscribe" or msg.get("type") in {"subscribed", "ack"}:
-                                print(f"Server ack: {msg}")
-                            continue
-
-                        # Check trades against threshold
-                        for tr in trades:
-                            trade_ts = tr.get("time")
-                            if trade_ts is not None:
-                                if trade_ts > 10_000_000_000:
-                                    trade_ts_sec = trade_ts / 1000.0
-                                else:
-                                    trade_ts_sec = trade_ts
-                                
-                                current_ts = datetime.now(tz=timezone.utc).timestamp()
-                                age_seconds = current_ts - trade_ts_sec
-                                
-                                if age_seconds > MAX_TRADE_AGE_SECONDS:
-                                    print(f"Skipping stale trade (age: {age_seconds:.1f}s, max: {MAX_TRADE_AGE_SECONDS}s)")
-                                    continue
-                            
-                            alert_msg, notional = format_trade(tr)
-                            if alert_msg and notional >= THRESHOLD:
-                                send_telegram_alert(alert_msg)
-                            elif notional > 0:
-                                print(f"Ignored small trade: ${notional:,.2f}")
-                finally:
-                    heartbeat_task.cancel()
-                    with contextlib.suppress(asyncio.CancelledError):
-                        await heartbeat_task
+                # Process incoming messages
+                async for raw in ws:
+                    try:
+                        msg = json_loads(raw)
+                    except Exception:
+                        print("Raw non-JSON message:", raw)
+                        continue
+
+                    trades = None
+                    if isinstance(msg, dict):
+                        if "data" in msg and isinstance(msg["data"], list):
+                            trades = msg["data"]
+                        elif "trades" in msg and isinstance(msg["trades"], list):
+                            trades = msg["trades"]
+
+                    if not trades:
+                        # Log subscription acknowledgment
+                        if msg.get("method") == "subscribe" or msg.get("type") in {"subscribed", "ack"}:
+                            print(f"Server ack: {msg}")
+                        continue
+
+                    # One clock read per frame; every trade in it arrived together
+                    current_ts = time.time()
+
+                    fresh = []
+                    for tr in trades:
+                        trade_ts = tr.get("time")
+                        if trade_ts is not None:
+                            trade_ts_sec = trade_ts * 1e-3 if trade_ts > 10_000_000_000 else trade_ts
+                            age_seconds = current_ts - trade_ts_sec
+
+                            if age_seconds > MAX_TRADE_AGE_SECONDS:
+                                print(f"Skipping stale trade (age: {age_seconds:.1f}s, max: {MAX_TRADE_AGE_SECONDS}s)")
+                                continue
+                        fresh.append(tr)
+
+                    # Check trades against threshold
+                    for tr in select_large_trades(fresh):
+                        alert_msg, notional = format_trade(tr)
+                        if alert_msg and notional >= threshold_for(tr.get("coin", COIN_SYMBOL)):
+                            loop.run_in_executor(None, send_telegram_alert, alert_msg)
+                        elif notional > 0:
+                            print(f"Ignored small trade: ${notional:,.2f}")
 
         except (websockets.ConnectionClosed, ConnectionError) as e:
             print(f"Connection closed: {e}")
-            send_developer_alert(f"big_position.py: WebSocket connection error: {e}")
+            loop.run_in_executor(None, send_developer_alert, f"big_position.py: WebSocket connection error: {e}")
         except Exception as e:
             print(f"Error: {e}")
-            send_developer_alert(f"big_position.py: Unexpected error: {e}")
+            loop.run_in_executor(None, send_developer_alert, f"big_position.py: Unexpected error: {e}")
 
         print(f"Reconnecting in {reconnect_delay:.1f}s...")
         await asyncio.sleep(reconnect_delay)
@@ -197,7 +249,7 @@ async def stream_trades():
 
 
 def main():
-    loop = asyncio.new_event_loop()
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
     stop = asyncio.Event()
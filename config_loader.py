@@ -1,57 +1,57 @@
-import json
-import os
+import functools
+from dataclasses import dataclass
 from pathlib import Path
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+CONFIG_PATH = Path(__file__).parent / "config.json"
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
-    _instance = None
-    _config = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Config, cls).__new__(cls)
-        return cls._instance
-    
-    def __init__(self):
-        if self._config is None:
-            self._load_config()
-    
-    def _load_config(self):
-        config_path = Path(__file__).parent / "config.json"
-        if not config_path.exists():
-            raise FileNotFoundError(f"Configuration file not found: {config_path}")
-        
-        with open(config_path, 'r') as f:
-            self._config = json.load(f)
-    
+    """Parsed config.json; the shared sections are resolved once at load."""
+    raw: dict
+    database: dict
+    api: dict
+    symbols: dict
+
     def get(self, *keys, default=None):
         """
         Get nested configuration value.
         Example: config.get('database', 'market_data_table')
         """
-        value = self._config
+        value = self.raw
         for key in keys:
             if isinstance(value, dict) and key in value:
                 value = value[key]
             else:
                 return default
         return value
-    
+
     def get_script_config(self, script_name):
         """Get all configuration for a specific script."""
         return self.get(script_name, default={})
-    
-    @property
-    def database(self):
-        return self.get('database', default={})
-    
-    @property
-    def api(self):
-        return self.get('api', default={})
-    
-    @property
-    def symbols(self):
-        return self.get('symbols', default={})
 
+
+@functools.cache
 def load_config():
-    """Convenience function to get config instance."""
-    return Config()
+    """Load config.json once per process and return the shared Config."""
+    if not CONFIG_PATH.exists():
+        raise FileNotFoundError(f"Configuration file not found: {CONFIG_PATH}")
+
+    with open(CONFIG_PATH, 'rb') as f:
+        raw = json_loads(f.read())
+    return Config(
+        raw=raw,
+        database=raw.get('database', {}),
+        api=raw.get('api', {}),
+        symbols=raw.get('symbols', {}),
+    )
+
+
+def get_script_config(script_name):
+    """Get all configuration for a specific script."""
+    return load_config().get_script_config(script_name)
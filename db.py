@@ -0,0 +1,43 @@
+"""Process-wide Postgres connection pool shared by the DB-backed monitors."""
+import os
+import threading
+
+from dotenv import load_dotenv
+from psycopg2.extensions import DECIMAL, new_type
+from psycopg2.pool import ThreadedConnectionPool
+
+load_dotenv()
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Enough for every DB-backed monitor in main.py to hold one connection at once
+MAX_CONNECTIONS = 4
+
+# numeric -> float typecaster; register it per cursor (register_type(DEC2FLOAT,
+# cur)) so other users of the pool still get Decimal
+DEC2FLOAT = new_type(
+    DECIMAL.values, 'DEC2FLOAT',
+    lambda value, curs: float(value) if value is not None else None,
+)
+
+_pool = None
+_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the shared pool, creating it on first use so import never touches the DB."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(
+                1, MAX_CONNECTIONS, DATABASE_URL,
+                keepalives=1, keepalives_idle=30,  # survive idle timeouts between ticks
+            )
+        return _pool
+
+
+def close_pool():
+    """Close every pooled connection; the next get_pool() starts a fresh pool."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
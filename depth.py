@@ -1,11 +1,17 @@
+import logging
 import os
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import register_type
 from dotenv import load_dotenv
-import requests
 import time
-from datetime import datetime, timedelta
+import weakref
+from collections import deque
 from config_loader import load_config
+from log_setup import configure_logging
+from db import DEC2FLOAT, get_pool, close_pool
+import notifier
+
+logger = logging.getLogger("depth")
 
 load_dotenv()
 config = load_config()
@@ -20,142 +26,212 @@ DEVELOPER_TELEGRAM_CHAT_ID = os.getenv("DEVELOPER_TELEGRAM_CHAT_ID")
 script_config = config.get_script_config('depth')
 CHECK_INTERVAL = script_config['check_interval_seconds']
 DEPTH_THRESHOLD_PERCENT = script_config['threshold_percent']
+WINDOW_MS = 3600000  # 1 hour in milliseconds
+
+# Alert text built once; only the timestamp varies per message
+DEPTH_ALERT_TMPL = "ALERT: Liquidity Depth Alert at {timestamp}\n{alerts}"
+BAND_ALERTS = {
+    band: f"{band} depth dropped below {DEPTH_THRESHOLD_PERCENT*100:.0f}% of last 1h avg"
+    for band in ("5bps", "10bps", "50bps", "100bps")
+}
 
 if not DATABASE_URL or not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     raise EnvironmentError("Missing required environment variables")
 
 def send_telegram_alert(message: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        print("Market alert sent.")
-    except Exception as e:
-        print("Failed to send market alert:", e)
+    # Queued; the notifier thread does the HTTPS round trip
+    notifier.enqueue(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, message, "Market")
 
 def send_developer_alert(message: str):
     if not DEVELOPER_TELEGRAM_BOT_TOKEN or not DEVELOPER_TELEGRAM_CHAT_ID:
         return
-    url = f"https://api.telegram.org/bot{DEVELOPER_TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": DEVELOPER_TELEGRAM_CHAT_ID, "text": message}
+    notifier.enqueue(DEVELOPER_TELEGRAM_BOT_TOKEN, DEVELOPER_TELEGRAM_CHAT_ID, message, "Developer")
+
+# Timestamp first so each row splits into (ts, depths) with one slice
+DEPTH_SELECT = f'''
+    SELECT 
+        timestamp,
+        (COALESCE(bid_depth_5bps, 0) + COALESCE(ask_depth_5bps, 0)),
+        (COALESCE(bid_depth_10bps, 0) + COALESCE(ask_depth_10bps, 0)),
+        (COALESCE(bid_depth_50bps, 0) + COALESCE(ask_depth_50bps, 0)),
+        (COALESCE(bid_depth_100bps, 0) + COALESCE(ask_depth_100bps, 0))
+    FROM {SCHEMA_NAME}.{TABLE_NAME}
+    WHERE {{where}}
+    ORDER BY timestamp ASC
+'''
+
+# Pooled connections that already hold the depth_window_since statement
+_prepared = weakref.WeakSet()
+
+def _prepare_since(conn):
+    """PREPARE the incremental window query once per session.
+
+    Prepared statements are session-scoped and survive the pool's rollback
+    on putconn, so each connection parses and plans it only once.
+    """
+    if conn in _prepared:
+        return
+    with conn.cursor() as cur:
+        cur.execute("PREPARE depth_window_since AS " + DEPTH_SELECT.format(where="timestamp > $1"))
+    _prepared.add(conn)
+
+class DepthWindow:
+    """Trailing hour of (timestamp, depths) rows with per-band running sums.
+
+    Each refresh fetches only rows newer than the last one seen and evicts
+    rows that aged out, instead of rescanning the whole hour every tick.
+    """
+
+    def __init__(self):
+        self.rows = deque()
+        self.running_sums = [0.0] * 4
+        self.last_ts = None
+
+    def refresh(self, conn):
+        if self.last_ts is None:
+            # Cold start: stream the whole trailing hour through a server-side
+            # cursor so the result set never sits in client memory at once
+            cur = conn.cursor(name="depth_window_load")
+            cur.itersize = 1000
+            query = DEPTH_SELECT.format(
+                where=f"timestamp >= (SELECT MAX(timestamp) FROM {SCHEMA_NAME}.{TABLE_NAME}) - %s"
+            )
+            params = (WINDOW_MS,)
+        else:
+            # Afterwards only rows newer than the last one seen, through a
+            # statement planned once per connection
+            _prepare_since(conn)
+            cur = conn.cursor()
+            query = "EXECUTE depth_window_since(%s);"
+            params = (self.last_ts,)
+        sums = self.running_sums
+        with cur:
+            # numeric columns arrive as floats; no per-value Decimal
+            register_type(DEC2FLOAT, cur)
+            cur.execute(query, params)
+            for r in cur:
+                depths = r[1:]
+                self.rows.append((r[0], depths))
+                sums[0] += depths[0]
+                sums[1] += depths[1]
+                sums[2] += depths[2]
+                sums[3] += depths[3]
+                # Per row, so a fetch cut short resumes without duplicates
+                self.last_ts = r[0]
+
+        if not self.rows:
+            return
+        # Rows are appended in timestamp order, so the newest is last
+        one_hour_ago = self.rows[-1][0] - WINDOW_MS
+        while self.rows[0][0] < one_hour_ago:
+            _, expired = self.rows.popleft()
+            sums[0] -= expired[0]
+            sums[1] -= expired[1]
+            sums[2] -= expired[2]
+            sums[3] -= expired[3]
+
+    def averages(self):
+        n = len(self.rows)
+        return tuple(total / n for total in self.running_sums)
+
+
+_window = DepthWindow()
+# Rate limiting for 5bps alerts: max 2 per hour, as time.monotonic() stamps
+ALERT_5BPS_MAX_PER_HOUR = 2
+_alert_5bps_ts = deque(maxlen=ALERT_5BPS_MAX_PER_HOUR)
+
+def check_liquidity_depth():
+    """Run one depth check: pull new rows into the window and alert on drops."""
+    conn = None
     try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        print("Developer alert sent.")
-    except Exception as e:
-        print("Failed to send developer alert:", e)
+        conn = get_pool().getconn()
+        _window.refresh(conn)
+    except (psycopg2.InterfaceError, psycopg2.OperationalError) as e:
+        # Dropped connection: discard it and reconnect on the next tick
+        logger.warning("Database connection lost, reconnecting: %s", e)
+        if conn is not None:
+            get_pool().putconn(conn, close=True)
+            conn = None
+        return
+    finally:
+        if conn is not None:
+            get_pool().putconn(conn)
+
+    if not _window.rows:
+        logger.info("No latest row found.")
+        return
+
+    latest_ts, latest_depths = _window.rows[-1]
+    avg_depth_5bps, avg_depth_10bps, avg_depth_50bps, avg_depth_100bps = _window.averages()
+    latest_depth_5bps, latest_depth_10bps, latest_depth_50bps, latest_depth_100bps = latest_depths
+
+    # Level-gated: the arguments are only formatted when DEBUG is on
+    logger.debug(
+        "Timestamp: %s | 5bps %s (1h avg %.2f) | 10bps %s (1h avg %.2f) | "
+        "50bps %s (1h avg %.2f) | 100bps %s (1h avg %.2f)",
+        latest_ts,
+        latest_depth_5bps, avg_depth_5bps, latest_depth_10bps, avg_depth_10bps,
+        latest_depth_50bps, avg_depth_50bps, latest_depth_100bps, avg_depth_100bps,
+    )
+
+    alerts = []
+
+    # Check 5bps alert with rate limiting (max 2 per hour)
+    if latest_depth_5bps < DEPTH_THRESHOLD_PERCENT * avg_depth_5bps:
+        now = time.monotonic()
+        # Expire stamps older than 1 hour; they are in append order
+        while _alert_5bps_ts and now - _alert_5bps_ts[0] >= 3600:
+            _alert_5bps_ts.popleft()
+
+        if len(_alert_5bps_ts) < ALERT_5BPS_MAX_PER_HOUR:
+            alerts.append(BAND_ALERTS["5bps"])
+            _alert_5bps_ts.append(now)
+        else:
+            logger.info(
+                "5bps alert suppressed (rate limit: %d per hour). Last alerts: %s",
+                ALERT_5BPS_MAX_PER_HOUR,
+                ", ".join(f"{(now - ts) / 60:.0f}m ago" for ts in _alert_5bps_ts),
+            )
+
+    if latest_depth_10bps < DEPTH_THRESHOLD_PERCENT * avg_depth_10bps:
+        alerts.append(BAND_ALERTS["10bps"])
+    if latest_depth_50bps < DEPTH_THRESHOLD_PERCENT * avg_depth_50bps:
+        alerts.append(BAND_ALERTS["50bps"])
+    if latest_depth_100bps < DEPTH_THRESHOLD_PERCENT * avg_depth_100bps:
+        alerts.append(BAND_ALERTS["100bps"])
+
+    if alerts:
+        # Timestamps stay integer ms; formatted only when a message goes out
+        msg = DEPTH_ALERT_TMPL.format_map({
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(int(latest_ts) // 1000)),
+            "alerts": "\n".join(alerts),
+        })
+        logger.info("%s", msg)
+        send_telegram_alert(msg)
+    else:
+        logger.debug("No significant liquidity drop at %s.", latest_ts)
 
 def monitor_liquidity_depth():
-    # Rate limiting for 5bps alerts: max 2 per hour
-    alert_5bps_timestamps = []
-    
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        print("Connected to Postgres successfully.\n")
-
         while True:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(f'''
-                    SELECT 
-                        (COALESCE(bid_depth_5bps, 0) + COALESCE(ask_depth_5bps, 0)) AS total_depth_5bps,
-                        (COALESCE(bid_depth_10bps, 0) + COALESCE(ask_depth_10bps, 0)) AS total_depth_10bps,
-                        (COALESCE(bid_depth_50bps, 0) + COALESCE(ask_depth_50bps, 0)) AS total_depth_50bps,
-                        (COALESCE(bid_depth_100bps, 0) + COALESCE(ask_depth_100bps, 0)) AS total_depth_100bps,
-                        timestamp
-                    FROM {SCHEMA_NAME}.{TABLE_NAME}
-                    ORDER BY timestamp DESC
-                    LIMIT 1;
-                ''')
-                latest_row = cur.fetchone()
-                if not latest_row:
-                    print("No latest row found.")
-                    time.sleep(CHECK_INTERVAL)
-                    continue
-
-                latest_ts = latest_row['timestamp']
-
-                one_hour_ago = latest_ts - 3600000  # 1 hour in milliseconds
-                cur.execute(f'''
-                    SELECT 
-                        (COALESCE(bid_depth_5bps, 0) + COALESCE(ask_depth_5bps, 0)) AS total_depth_5bps,
-                        (COALESCE(bid_depth_10bps, 0) + COALESCE(ask_depth_10bps, 0)) AS total_depth_10bps,
-                        (COALESCE(bid_depth_50bps, 0) + COALESCE(ask_depth_50bps, 0)) AS total_depth_50bps,
-                        (COALESCE(bid_depth_100bps, 0) + COALESCE(ask_depth_100bps, 0)) AS total_depth_100bps
-                    FROM {SCHEMA_NAME}.{TABLE_NAME}
-                    WHERE timestamp >= %s
-                    ORDER BY timestamp ASC;
-                ''', (one_hour_ago,))
-                last_hour_rows = cur.fetchall()
-                if not last_hour_rows:
-                    print("No rows in the last hour.")
-                    time.sleep(CHECK_INTERVAL)
-                    continue
-
-                avg_depth_5bps = float(sum(r['total_depth_5bps'] for r in last_hour_rows) / len(last_hour_rows))
-                avg_depth_10bps = float(sum(r['total_depth_10bps'] for r in last_hour_rows) / len(last_hour_rows))
-                avg_depth_50bps = float(sum(r['total_depth_50bps'] for r in last_hour_rows) / len(last_hour_rows))
-                avg_depth_100bps = float(sum(r['total_depth_100bps'] for r in last_hour_rows) / len(last_hour_rows))
-
-                latest_depth_5bps = float(latest_row['total_depth_5bps'])
-                latest_depth_10bps = float(latest_row['total_depth_10bps'])
-                latest_depth_50bps = float(latest_row['total_depth_50bps'])
-                latest_depth_100bps = float(latest_row['total_depth_100bps'])
-
-                timestamp_dt = datetime.fromtimestamp(latest_ts / 1000).replace(microsecond=0)
-                print(f"Timestamp: {timestamp_dt}")
-                print(f"5bps Depth: Latest = {latest_depth_5bps}, 1h Avg = {avg_depth_5bps:.2f}")
-                print(f"10bps Depth: Latest = {latest_depth_10bps}, 1h Avg = {avg_depth_10bps:.2f}")
-                print(f"50bps Depth: Latest = {latest_depth_50bps}, 1h Avg = {avg_depth_50bps:.2f}")
-                print(f"100bps Depth: Latest = {latest_depth_100bps}, 1h Avg = {avg_depth_100bps:.2f}\n")
-
-                alerts = []
-                
-                # Check 5bps alert with rate limiting (max 2 per hour)
-                if latest_depth_5bps < DEPTH_THRESHOLD_PERCENT * avg_depth_5bps:
-                    current_time = datetime.now()
-                    # Remove timestamps older than 1 hour
-                    alert_5bps_timestamps[:] = [ts for ts in alert_5bps_timestamps 
-                                                 if current_time - ts < timedelta(hours=1)]
-                    
-                    if len(alert_5bps_timestamps) < 2:
-                        alerts.append(f"5bps depth dropped below {DEPTH_THRESHOLD_PERCENT*100:.0f}% of last 1h avg")
-                        alert_5bps_timestamps.append(current_time)
-                    else:
-                        print(f"  5bps alert suppressed (rate limit: 2 per hour). Last alerts: {alert_5bps_timestamps}")
-                
-                if latest_depth_10bps < DEPTH_THRESHOLD_PERCENT * avg_depth_10bps:
-                    alerts.append(f"10bps depth dropped below {DEPTH_THRESHOLD_PERCENT*100:.0f}% of last 1h avg")
-                if latest_depth_50bps < DEPTH_THRESHOLD_PERCENT * avg_depth_50bps:
-                    alerts.append(f"50bps depth dropped below {DEPTH_THRESHOLD_PERCENT*100:.0f}% of last 1h avg")
-                if latest_depth_100bps < DEPTH_THRESHOLD_PERCENT * avg_depth_100bps:
-                    alerts.append(f"100bps depth dropped below {DEPTH_THRESHOLD_PERCENT*100:.0f}% of last 1h avg")
-
-                if alerts:
-                    formatted_time = timestamp_dt.strftime("%Y-%m-%d %H:%M:%S")
-                    msg = f"ALERT: Liquidity Depth Alert at {formatted_time}\n" + "\n".join(alerts)
-                    print(msg)
-                    send_telegram_alert(msg)
-                else:
-                    print(f"No significant liquidity drop at {timestamp_dt}.\n")
-
+            check_liquidity_depth()
             time.sleep(CHECK_INTERVAL)
 
     except KeyboardInterrupt:
-        print("Monitoring stopped by user")
+        logger.info("Monitoring stopped by user")
         send_developer_alert("depth.py: Stopped by user (Ctrl+C)")
     except psycopg2.Error as e:
-        print("Database error:", e)
+        logger.error("Database error: %s", e)
         send_developer_alert(f"depth.py: Database error: {e}")
     except Exception as e:
-        print("Error monitoring liquidity:", e)
+        logger.error("Error monitoring liquidity: %s", e)
         send_developer_alert(f"depth.py: Crashed with error: {e}")
         raise
     finally:
-        if 'conn' in locals():
-            conn.close()
+        close_pool()
 
 if __name__ == "__main__":
+    configure_logging()
     try:
         monitor_liquidity_depth()
     except Exception as e:
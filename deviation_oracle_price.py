@@ -1,8 +1,13 @@
+import logging
 import os
 import time
-import requests
 from dotenv import load_dotenv
 from config_loader import load_config
+from hyperliquid_api import API_URL, fetch_meta_and_asset_ctxs, find_coin_index
+from log_setup import configure_logging
+import notifier
+
+logger = logging.getLogger("deviation_oracle_price")
 
 load_dotenv()
 config = load_config()
@@ -14,169 +19,112 @@ DEVELOPER_TELEGRAM_BOT_TOKEN = os.getenv("DEVELOPER_TELEGRAM_BOT_TOKEN")
 DEVELOPER_TELEGRAM_CHAT_ID = os.getenv("DEVELOPER_TELEGRAM_CHAT_ID")
 COIN_SYMBOL = os.getenv("COIN_SYMBOL", config.symbols['primary_coin'])
 
-if NETWORK == "mainnet":
-    API_URL = "https://api.hyperliquid.xyz/info"
-else:
-    API_URL = "https://api.hyperliquid-testnet.xyz/info"
-
 required_vars = ["TELEGRAM_BOT_TOKEN", "TELEGRAM_CHAT_ID"]
 missing = [v for v in required_vars if not os.getenv(v)]
 if missing:
     raise EnvironmentError(f"Missing environment variables: {', '.join(missing)}")
 
-print(f"Using {NETWORK} network: {API_URL}")
-
 script_config = config.get_script_config('deviation_oracle_price')
-body = {"type": "metaAndAssetCtxs", "dex": config.api['dex']}
 THRESHOLD_PERCENT = script_config['threshold_percent']  # Alert threshold: percent deviation from oracle price  
+CHECK_INTERVAL = script_config['check_interval_seconds']
+
+# Alert text built once; filled per breach with format_map
+ALERT_TMPL = (
+    "ALERT: Impact price deviated more than {threshold}% from Oracle Price.\n\n"
+    "Oracle Price: {oracle_px:.2f}\n"
+    "Impact Price: {impact_px:.2f}\n"
+    "Difference: {diff:.2f}%"
+)
 
 
 def send_telegram_alert(message: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        print("Market alert sent.")
-    except Exception as e:
-        print("Failed to send market alert:", e)
+    # Queued; the notifier thread does the HTTPS round trip
+    notifier.enqueue(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, message, "Market")
 
 def send_developer_alert(message: str):
     if not DEVELOPER_TELEGRAM_BOT_TOKEN or not DEVELOPER_TELEGRAM_CHAT_ID:
         return
-    url = f"https://api.telegram.org/bot{DEVELOPER_TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": DEVELOPER_TELEGRAM_CHAT_ID, "text": message}
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        print("Developer alert sent.")
-    except Exception as e:
-        print("Failed to send developer alert:", e)
+    notifier.enqueue(DEVELOPER_TELEGRAM_BOT_TOKEN, DEVELOPER_TELEGRAM_CHAT_ID, message, "Developer")
 
 
 def fetch_data():
     try:
-        resp = requests.post(API_URL, json=body, timeout=10)
-        resp.raise_for_status()
-        return resp.json()
+        # Shared with the other metaAndAssetCtxs consumers for one TTL bucket
+        return fetch_meta_and_asset_ctxs()
     except Exception as e:
-        print("Request failed:", e)
+        logger.warning("Request failed: %s", e)
         send_developer_alert(f"API request failed in deviation_oracle_price.py: {e}")
         return None
 
 
-def find_coin_index(universe, coin_symbol):
-    if not isinstance(universe, list):
-        return None
-    for i, asset in enumerate(universe):
-        if isinstance(asset, dict) and asset.get("name") == coin_symbol:
-            return i
-    return None
-
 def check_price_impact():
     data = fetch_data()
     if not data:
-        print("API response failed for price impact check.")
+        logger.warning("API response failed for price impact check.")
         return
 
+    # The response shape is fixed; index straight in and let one handler
+    # report anything that does not fit instead of pre-checking each level
     try:
-        if not isinstance(data, list) or len(data) < 2:
-            print(f"Unexpected API response structure: {type(data)}")
-            send_developer_alert(f"deviation_oracle_price.py: Unexpected API response structure: {type(data)}")
-            return
-        
-        universe = data[0].get("universe") if isinstance(data[0], dict) else None
-        coin_index = find_coin_index(universe, COIN_SYMBOL)
-        
+        coin_index = find_coin_index(data[0]["universe"], COIN_SYMBOL)
         if coin_index is None:
-            print(f"Coin {COIN_SYMBOL} not found in universe")
+            logger.warning("Coin %s not found in universe", COIN_SYMBOL)
             send_developer_alert(f"deviation_oracle_price.py: Coin {COIN_SYMBOL} not found in universe")
             return
-        
-        if not isinstance(data[1], list) or len(data[1]) <= coin_index:
-            print("Market data not available for coin index")
-            send_developer_alert(f"deviation_oracle_price.py: Market data not available for coin index {coin_index}")
-            return
-        
+
         market_data = data[1][coin_index]
-        
-        required_fields = ["oraclePx", "impactPxs"]
-        for field in required_fields:
-            if field not in market_data:
-                print(f"Missing field '{field}' in market data")
-                send_developer_alert(f"deviation_oracle_price.py: Missing field '{field}' in market data")
-                return
-        
         oracle_px = float(market_data["oraclePx"])
         impact_pxs = market_data["impactPxs"]
-        
         if impact_pxs is None:
-            print(f"impactPxs is None - market may be inactive or data unavailable")
+            logger.info("impactPxs is None - market may be inactive or data unavailable")
             return
-        
-        if not isinstance(impact_pxs, list):
-            print(f"Invalid impactPxs format (not a list): {type(impact_pxs)}")
-            send_developer_alert(f"deviation_oracle_price.py: impactPxs is not a list: {type(impact_pxs)}")
+        if len(impact_pxs) < 2 or any(px in (None, "", "null") for px in impact_pxs[:2]):
+            logger.warning("Bid or ask impact price is missing or empty: %s", impact_pxs)
+            send_developer_alert(f"deviation_oracle_price.py: Bid or ask impact price is missing or empty: {impact_pxs}")
             return
-        
-        if len(impact_pxs) < 2:
-            print(f"Invalid impactPxs format (insufficient elements): {impact_pxs}")
-            send_developer_alert(f"deviation_oracle_price.py: impactPxs has only {len(impact_pxs)} elements")
-            return
-        
-        try:
-            bid_px = float(impact_pxs[0]) if impact_pxs[0] not in (None, "", "null") else None
-            ask_px = float(impact_pxs[1]) if impact_pxs[1] not in (None, "", "null") else None
-        except (ValueError, TypeError) as e:
-            print(f"Failed to convert impactPxs to float: {impact_pxs}, error: {e}")
-            send_developer_alert(f"deviation_oracle_price.py: Failed to convert impactPxs to float: {e}")
-            return
-        
-        if bid_px is None or ask_px is None:
-            print(f"Bid or ask price is None or empty: bid={impact_pxs[0]}, ask={impact_pxs[1]}")
-            send_developer_alert(f"deviation_oracle_price.py: Bid or ask price is None or empty")
-            return
-            
+
+        bid_px = float(impact_pxs[0])
+        ask_px = float(impact_pxs[1])
     except (KeyError, IndexError, TypeError, ValueError) as e:
-        print(f"Failed to extract price data: {e}")
-        send_developer_alert(f"deviation_oracle_price.py: Failed to extract price data: {e}")
+        logger.warning("Failed to extract price data: %r", e)
+        send_developer_alert(f"deviation_oracle_price.py: Failed to extract price data: {e!r}")
         return
 
     impact_px = (bid_px + ask_px) / 2
-    print(f"Oracle Price: {oracle_px}, Impact Price (avg of bid/ask): {impact_px}")
+    logger.debug("Oracle Price: %s, Impact Price (avg of bid/ask): %s", oracle_px, impact_px)
 
     impact_diff_percent = abs((impact_px - oracle_px) / oracle_px) * 100
 
     if impact_diff_percent > THRESHOLD_PERCENT:
-        msg = (
-            f"ALERT: Impact price deviated more than {THRESHOLD_PERCENT}% from Oracle Price.\n\n"
-            f"Oracle Price: {oracle_px:.2f}\n"
-            f"Impact Price: {impact_px:.2f}\n"
-            f"Difference: {impact_diff_percent:.2f}%"
-        )
-        send_telegram_alert(msg)
-        print(f"Alert sent: Impact price deviation {impact_diff_percent:.2f}%")
+        send_telegram_alert(ALERT_TMPL.format_map({
+            "threshold": THRESHOLD_PERCENT,
+            "oracle_px": oracle_px,
+            "impact_px": impact_px,
+            "diff": impact_diff_percent,
+        }))
+        logger.info("Alert sent: Impact price deviation %.2f%%", impact_diff_percent)
     else:
-        print(f"OK: Impact price is within {THRESHOLD_PERCENT}% of Oracle Price.")
+        logger.debug("OK: Impact price is within %s%% of Oracle Price.", THRESHOLD_PERCENT)
 
 
 if __name__ == "__main__":
-    CHECK_INTERVAL = script_config['check_interval_seconds']
-    print(f"Starting price impact monitoring loop (interval: {CHECK_INTERVAL} seconds)... Press Ctrl+C to stop.")
+    configure_logging()
+    logger.info("Using %s network: %s", NETWORK, API_URL)
+    logger.info("Starting price impact monitoring loop (interval: %s seconds)... Press Ctrl+C to stop.", CHECK_INTERVAL)
     try:
         while True:
             try:
                 check_price_impact()
             except Exception as e:
-                print(f"Error in check_price_impact: {e}")
+                logger.error("Error in check_price_impact: %s", e)
                 send_developer_alert(f"deviation_oracle_price.py: Error in monitoring loop: {e}")
                 time.sleep(60)  # Wait a bit before retrying
                 continue
             time.sleep(CHECK_INTERVAL)
     except KeyboardInterrupt:
         send_developer_alert("deviation_oracle_price.py: Stopped by user (Ctrl+C)")
-        print("\nStopped by user.")
+        logger.info("Stopped by user.")
     except Exception as e:
         send_developer_alert(f"deviation_oracle_price.py: Crashed with error: {e}")
-        print(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         raise
@@ -0,0 +1,28 @@
+"""Shared keep-alive HTTP sessions for the Telegram and Hyperliquid calls."""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def _session(retry_statuses):
+    # Every call made through here is a POST, so POST is explicitly allowed
+    # to retry
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=4,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=retry_statuses,
+            allowed_methods=frozenset({"POST"}),
+        ),
+    ))
+    return session
+
+
+# Transient 429/5xx responses are retried with backoff
+SESSION = _session([429, 500, 502, 503, 504])
+# Telegram 429s carry a retry_after the notifier honours itself, so only
+# 5xx is retried at the transport level
+TELEGRAM_SESSION = _session([500, 502, 503, 504])
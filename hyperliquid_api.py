@@ -0,0 +1,99 @@
+"""Shared, short-lived cache of the Hyperliquid info API responses."""
+import hashlib
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from config_loader import load_config
+from http_client import SESSION
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+load_dotenv()  # NETWORK may come from .env; importers load it after us
+config = load_config()
+
+NETWORK = os.getenv("NETWORK", "testnet").lower()
+if NETWORK == "mainnet":
+    API_URL = "https://api.hyperliquid.xyz/info"
+else:
+    API_URL = "https://api.hyperliquid-testnet.xyz/info"
+
+META_AND_ASSET_CTXS_BODY = {"type": "metaAndAssetCtxs", "dex": config.api['dex']}
+PERP_DEX_LIMITS_BODY = {"type": "perpDexLimits", "dex": config.api['dex']}
+
+# One response serves every caller within the same TTL bucket. For
+# metaAndAssetCtxs the TTL is the fastest consumer's poll interval so no
+# caller ever sees a stale tick; other request types only coalesce callers
+# that ask at nearly the same moment.
+CACHE_TTL_SECONDS = min(
+    config.get_script_config('deviation_oracle_price')['check_interval_seconds'],
+    config.get_script_config('funding_rate')['check_interval_seconds'],
+)
+DEFAULT_TTL_SECONDS = 5
+TTL_SECONDS = {"metaAndAssetCtxs": CACHE_TTL_SECONDS}
+
+# request key -> lock held across its fetch, so concurrent callers wait for
+# one request instead of each sending their own
+_locks = {}
+_locks_lock = threading.Lock()
+# request key -> (bucket, digest of the response body, parsed response)
+_cached = {}
+
+
+def fetch_info(body):
+    """Return the info API response for body, fetched at most once per TTL bucket.
+
+    Buckets are aligned to now // TTL for the body's type, so callers asking
+    in the same bucket share one response. A response whose body is byte-for-
+    byte unchanged reuses the previous parse. Callers must treat it as
+    read-only. Raises on HTTP or decode errors, like requests does.
+    """
+    key = tuple(sorted(body.items()))
+    bucket = int(time.time() // TTL_SECONDS.get(body["type"], DEFAULT_TTL_SECONDS))
+    with _locks_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        cached = _cached.get(key)
+        if cached is not None and cached[0] == bucket:
+            return cached[2]
+        resp = SESSION.post(API_URL, json=body, timeout=10)
+        resp.raise_for_status()
+        digest = hashlib.blake2b(resp.content, digest_size=16).digest()
+        if cached is not None and cached[1] == digest:
+            data = cached[2]
+        else:
+            data = json_loads(resp.content)
+        _cached[key] = (bucket, digest, data)
+        return data
+
+
+def fetch_meta_and_asset_ctxs():
+    """Return the metaAndAssetCtxs response shared by every monitor."""
+    return fetch_info(META_AND_ASSET_CTXS_BODY)
+
+
+# name -> index maps keyed by a cheap universe fingerprint; only the latest
+# fingerprint is kept since the listing rarely changes between ticks
+_index_cache = {}
+
+
+def find_coin_index(universe, coin_symbol):
+    """Index of coin_symbol in a meta universe list, or None if absent."""
+    if not isinstance(universe, list) or not universe:
+        return None
+    last = universe[-1]
+    key = (len(universe), last.get("name") if isinstance(last, dict) else None)
+    names = _index_cache.get(key)
+    if names is None:
+        names = {}
+        for i, asset in enumerate(universe):
+            if isinstance(asset, dict):
+                names.setdefault(asset.get("name"), i)  # first match wins
+        _index_cache.clear()
+        _index_cache[key] = names
+    return names.get(coin_symbol)
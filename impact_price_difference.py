@@ -1,11 +1,15 @@
+import logging
 import os
 import time
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
-import requests
-from datetime import datetime, timedelta, timezone
 from config_loader import load_config
+from log_setup import configure_logging
+from db import get_pool
+import notifier
+
+logger = logging.getLogger("impact_price_difference")
 
 load_dotenv()
 config = load_config()
@@ -21,147 +25,145 @@ script_config = config.get_script_config('impact_price_difference')
 THRESHOLD_PCT = script_config['threshold_percent']
 CHECK_INTERVAL = script_config['check_interval_seconds']
 
+# Alert text built once; filled per breach with format_map
+ALERT_TMPL = (
+    "ALERT: {label} Price deviation exceeds {threshold}%\n\n"
+    "Timestamp: {timestamp}\n"
+    "{label} Price (avg of 1h): {avg:.8f}\n"
+    "current {label} Price: {latest:.8f}\n"
+    "Deviation: {diff:.2f}%"
+)
+
 if not DATABASE_URL or not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     raise EnvironmentError("Missing required environment variables")
 
 def send_telegram_alert(message: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        print("Market alert sent.")
-    except Exception as e:
-        print("Failed to send market alert:", e)
+    # Queued; the notifier thread does the HTTPS round trip
+    notifier.enqueue(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, message, "Market")
 
 def send_developer_alert(message: str):
     if not DEVELOPER_TELEGRAM_BOT_TOKEN or not DEVELOPER_TELEGRAM_CHAT_ID:
         return
-    url = f"https://api.telegram.org/bot{DEVELOPER_TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": DEVELOPER_TELEGRAM_CHAT_ID, "text": message}
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        print("Developer alert sent.")
-    except Exception as e:
-        print("Failed to send developer alert:", e)
-
-def pct_diff(latest, avg):
-    if avg is None or avg == 0:
-        return 0
-    return abs(latest - avg) / avg * 100
+    notifier.enqueue(DEVELOPER_TELEGRAM_BOT_TOKEN, DEVELOPER_TELEGRAM_CHAT_ID, message, "Developer")
 
 def check_volatility():
+    conn = None
     try:
-        conn = psycopg2.connect(DATABASE_URL)
+        conn = get_pool().getconn()
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            # Latest complete row, its trailing-hour averages, the percent
+            # deviations and the threshold breaches, all in one round trip
             cur.execute(f'''
-                SELECT impactpxs_bid, impactpxs_ask, oraclepx, markpx, timestamp
-                FROM {SCHEMA_NAME}.{TABLE_NAME}
-                WHERE impactpxs_bid IS NOT NULL 
-                  AND impactpxs_ask IS NOT NULL 
-                  AND oraclepx IS NOT NULL
-                  AND markpx IS NOT NULL
-                ORDER BY timestamp DESC
-                LIMIT 1;
-            ''')
-            latest_row = cur.fetchone()
-            if not latest_row:
-                print("No latest row found.")
-                return
-
-            latest_ts = latest_row['timestamp']
-
-            one_hour_ago = latest_ts - 3600000
-            cur.execute(f'''
-                SELECT impactpxs_bid, impactpxs_ask, oraclepx, markpx
-                FROM {SCHEMA_NAME}.{TABLE_NAME}
-                WHERE timestamp >= %s
-                  AND impactpxs_bid IS NOT NULL 
-                  AND impactpxs_ask IS NOT NULL 
-                  AND oraclepx IS NOT NULL
-                  AND markpx IS NOT NULL
-                ORDER BY timestamp ASC;
-            ''', (one_hour_ago,))
-            last_hour_rows = cur.fetchall()
-
-            if not last_hour_rows:
-                print("No rows in the last hour.")
+                WITH latest AS (
+                    SELECT impactpxs_bid, impactpxs_ask, oraclepx, markpx, timestamp
+                    FROM {SCHEMA_NAME}.{TABLE_NAME}
+                    WHERE impactpxs_bid IS NOT NULL 
+                      AND impactpxs_ask IS NOT NULL 
+                      AND oraclepx IS NOT NULL
+                      AND markpx IS NOT NULL
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                ),
+                -- float8 so the hour is summed in double precision rather
+                -- than arbitrary-precision numeric
+                agg AS (
+                    SELECT
+                        AVG((impactpxs_bid + impactpxs_ask)::float8 / 2) AS avg_impact_px,
+                        AVG(oraclepx::float8) AS avg_oracle,
+                        AVG(markpx::float8) AS avg_mark
+                    FROM {SCHEMA_NAME}.{TABLE_NAME}
+                    WHERE timestamp >= (SELECT timestamp - 3600000 FROM latest)
+                      AND impactpxs_bid IS NOT NULL 
+                      AND impactpxs_ask IS NOT NULL 
+                      AND oraclepx IS NOT NULL
+                      AND markpx IS NOT NULL
+                ),
+                dev AS (
+                    SELECT
+                        latest.timestamp,
+                        (latest.impactpxs_bid + latest.impactpxs_ask)::float8 / 2 AS latest_impact_px,
+                        latest.oraclepx::float8 AS latest_oracle,
+                        latest.markpx::float8 AS latest_mark,
+                        agg.*
+                    FROM latest, agg
+                ),
+                -- A zero average counts as no deviation
+                diffs AS (
+                    SELECT
+                        dev.*,
+                        COALESCE(ABS(latest_impact_px - avg_impact_px) / NULLIF(avg_impact_px, 0) * 100, 0) AS impact_diff,
+                        COALESCE(ABS(latest_oracle - avg_oracle) / NULLIF(avg_oracle, 0) * 100, 0) AS oracle_diff,
+                        COALESCE(ABS(latest_mark - avg_mark) / NULLIF(avg_mark, 0) * 100, 0) AS mark_diff
+                    FROM dev
+                )
+                SELECT
+                    diffs.*,
+                    impact_diff > %(threshold)s AS impact_breach,
+                    oracle_diff > %(threshold)s AS oracle_breach,
+                    mark_diff > %(threshold)s AS mark_breach
+                FROM diffs;
+            ''', {"threshold": THRESHOLD_PCT})
+            row = cur.fetchone()
+            if not row:
+                logger.info("No latest row found.")
                 return
 
-            avg_impact_px = float(sum((r['impactpxs_bid'] + r['impactpxs_ask']) / 2 for r in last_hour_rows) / len(last_hour_rows))
-            avg_oracle = float(sum(r['oraclepx'] for r in last_hour_rows) / len(last_hour_rows))
-            avg_mark = float(sum(r['markpx'] for r in last_hour_rows) / len(last_hour_rows))
+            latest_ts = row['timestamp']
 
-            latest_impact_px = float((latest_row['impactpxs_bid'] + latest_row['impactpxs_ask']) / 2)
-            latest_oracle = float(latest_row['oraclepx'])
-            latest_mark = float(latest_row['markpx'])
+            # The window always holds the latest row, so the averages are never NULL
+            series = (
+                ("Impact", row['latest_impact_px'], row['avg_impact_px'], row['impact_diff'], row['impact_breach']),
+                ("Oracle", row['latest_oracle'], row['avg_oracle'], row['oracle_diff'], row['oracle_breach']),
+                ("Mark", row['latest_mark'], row['avg_mark'], row['mark_diff'], row['mark_breach']),
+            )
 
-            impact_diff = pct_diff(latest_impact_px, avg_impact_px)
-            oracle_diff = pct_diff(latest_oracle, avg_oracle)
-            mark_diff = pct_diff(latest_mark, avg_mark)
-
-            timestamp_dt = datetime.fromtimestamp(latest_ts / 1000)
-            print(f"Timestamp: {timestamp_dt}")
-            print(f"Latest Impact Price: {latest_impact_px:.8f}, 1h Avg: {avg_impact_px:.8f}, Deviation: {impact_diff:.2f}%")
-            print(f"Latest Oracle Price: {latest_oracle:.8f}, 1h Avg: {avg_oracle:.8f}, Deviation: {oracle_diff:.2f}%")
-            print(f"Latest Mark Price: {latest_mark:.8f}, 1h Avg: {avg_mark:.8f}, Deviation: {mark_diff:.2f}%\n")
+            logger.debug("Timestamp: %s", latest_ts)
 
             alerts_sent = []
-            
-            if impact_diff > THRESHOLD_PCT:
-                msg = (
-                    f"ALERT: Impact Price deviation exceeds {THRESHOLD_PCT}%\n\n"
-                    f"Timestamp: {timestamp_dt}\n"
-                    f"Impact Price (avg of 1h): {avg_impact_px:.8f}\n"
-                    f"current Impact Price: {latest_impact_px:.8f}\n"
-                    f"Deviation: {impact_diff:.2f}%"
-                )
-                print(f"Sending Impact price alert")
-                send_telegram_alert(msg)
-                alerts_sent.append("Impact")
-            
-            if oracle_diff > THRESHOLD_PCT:
-                msg = (
-                    f"ALERT: Oracle Price deviation exceeds {THRESHOLD_PCT}%\n\n"
-                    f"Timestamp: {timestamp_dt}\n"
-                    f"Oracle Price (avg of 1h): {avg_oracle:.8f}\n"
-                    f"current Oracle Price: {latest_oracle:.8f}\n"
-                    f"Deviation: {oracle_diff:.2f}%"
-                )
-                print(f"Sending Oracle price alert")
-                send_telegram_alert(msg)
-                alerts_sent.append("Oracle")
-            
-            if mark_diff > THRESHOLD_PCT:
-                msg = (
-                    f"ALERT: Mark Price deviation exceeds {THRESHOLD_PCT}%\n\n"
-                    f"Timestamp: {timestamp_dt}\n"
-                    f"Mark Price (avg of 1h): {avg_mark:.8f}\n"
-                    f"current Mark Price: {latest_mark:.8f}\n"
-                    f"Deviation: {mark_diff:.2f}%"
-                )
-                print(f"Sending Mark price alert")
-                send_telegram_alert(msg)
-                alerts_sent.append("Mark")
-            
+            timestamp_str = None
+            for label, latest, avg, diff, breach in series:
+                # Level-gated: the arguments are only formatted when DEBUG is on
+                logger.debug("Latest %s Price: %.8f, 1h Avg: %.8f, Deviation: %.2f%%", label, latest, avg, diff)
+                if breach:
+                    if timestamp_str is None:
+                        # Timestamps stay integer ms; formatted only when a message goes out
+                        timestamp_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(int(latest_ts) // 1000))
+                    logger.info("Sending %s price alert", label)
+                    send_telegram_alert(ALERT_TMPL.format_map({
+                        "label": label,
+                        "threshold": THRESHOLD_PCT,
+                        "timestamp": timestamp_str,
+                        "avg": avg,
+                        "latest": latest,
+                        "diff": diff,
+                    }))
+                    alerts_sent.append(label)
+
             if not alerts_sent:
-                print(f"No significant deviation detected.\n")
+                logger.debug("No significant deviation detected.")
             else:
-                print(f"Alerts sent for: {', '.join(alerts_sent)}\n")
+                logger.info("Alerts sent for: %s", ", ".join(alerts_sent))
 
+    except (psycopg2.InterfaceError, psycopg2.OperationalError) as e:
+        # Dropped connection: discard it so the next tick gets a fresh one
+        logger.warning("Database connection lost: %s", e)
+        send_developer_alert(f"impact_price_difference.py: Database error: {e}")
+        if conn is not None:
+            get_pool().putconn(conn, close=True)
+            conn = None
     except psycopg2.Error as e:
-        print("Database error:", e)
+        logger.error("Database error: %s", e)
         send_developer_alert(f"impact_price_difference.py: Database error: {e}")
     except Exception as e:
-        print("Error connecting or processing rows:", e)
+        logger.error("Error connecting or processing rows: %s", e)
         send_developer_alert(f"impact_price_difference.py: Error processing: {e}")
     finally:
-        if 'conn' in locals():
-            conn.close()
+        if conn is not None:
+            get_pool().putconn(conn)
 
 if __name__ == "__main__":
-    print("Starting volatility monitoring...\n")
+    configure_logging()
+    logger.info("Starting volatility monitoring...")
     while True:
         check_volatility()
         time.sleep(CHECK_INTERVAL)
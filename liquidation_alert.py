@@ -1,11 +1,20 @@
+import atexit
+import logging
 import os
+import signal
+import threading
 import time
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import register_type
 from dotenv import load_dotenv
-import requests
+from collections import OrderedDict
 from datetime import datetime
 from config_loader import load_config
+from db import DEC2FLOAT, get_pool, close_pool
+from log_setup import configure_logging
+import notifier
+
+logger = logging.getLogger("liquidation_alert")
 
 load_dotenv()
 config = load_config()
@@ -20,6 +29,39 @@ CHECK_INTERVAL = script_config['check_interval_seconds']
 MIN_POSITION_VALUE = script_config['min_position_value']
 MAX_LEVERAGE = script_config['max_leverage']
 MARGIN_THRESHOLD_MULTIPLIER = script_config['margin_threshold_multiplier']
+# Alert when mark price is within this fraction of the liquidation price
+LIQUIDATION_DISTANCE = 0.1
+POSITIONS_FETCH_SIZE = 2000
+# Set to end the monitoring loop; waits on it return as soon as it is set
+stop_event = threading.Event()
+# A position is not re-alerted within this window unless its distance to
+# liquidation moves to another whole percent. It spans at least one full poll
+# interval, otherwise entries expire before the next check and never suppress
+ALERT_SUPPRESS_SECONDS = max(900, 2 * CHECK_INTERVAL)
+ALERT_SUPPRESS_MAX = 10000
+# (address, distance bucket) -> time.monotonic() it was alerted, oldest first
+_recent_alerts = OrderedDict()
+# Config-derived bind values for the positions query; fixed for the process
+POSITIONS_QUERY_PARAMS = {
+    "min_value": MIN_POSITION_VALUE,
+    "max_distance": LIQUIDATION_DISTANCE,
+}
+
+# Alert text built once; filled per at-risk row, whose columns are ALERT_FIELDS
+ALERT_FIELDS = (
+    "address", "abs_value", "mark_px", "liquidation_price",
+    "distance_pct", "leverage_value", "unrealized_pnl",
+)
+LIQUIDATION_ALERT_TMPL = (
+    "LIQUIDATION WARNING!\n"
+    "Address: {address}\n"
+    "Position Value: ${abs_value:,.2f}\n"
+    "Mark Price: ${mark_px:.2f}\n"
+    "Liquidation Price: ${liquidation_price:.2f}\n"
+    "Distance to Liquidation: {distance_pct:.2f}%\n"
+    "Leverage: {leverage_value}x\n"
+    "Unrealized PnL: ${unrealized_pnl:+,.2f}"
+)
 MARKET_DATA_TABLE = config.database['market_data_table']
 POSITIONS_TABLE = config.database['positions_table']
 MARKET_SCHEMA = config.database['market_data_schema']
@@ -29,155 +71,147 @@ if not DATABASE_URL or not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     raise EnvironmentError("Missing required environment variables")
 
 def send_telegram_alert(message: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        print("Market alert sent.")
-    except Exception as e:
-        print("Failed to send market alert:", e)
+    # Queued; the notifier thread does the HTTPS round trip
+    notifier.enqueue(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, message, "Market")
 
 def send_developer_alert(message: str):
     if not DEVELOPER_TELEGRAM_BOT_TOKEN or not DEVELOPER_TELEGRAM_CHAT_ID:
         return
-    url = f"https://api.telegram.org/bot{DEVELOPER_TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": DEVELOPER_TELEGRAM_CHAT_ID, "text": message}
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        print("Developer alert sent.")
-    except Exception as e:
-        print("Failed to send developer alert:", e)
+    notifier.enqueue(DEVELOPER_TELEGRAM_BOT_TOKEN, DEVELOPER_TELEGRAM_CHAT_ID, message, "Developer")
+
+def _expire_recent_alerts(now):
+    while _recent_alerts:
+        ts = next(iter(_recent_alerts.values()))
+        if now - ts < ALERT_SUPPRESS_SECONDS and len(_recent_alerts) < ALERT_SUPPRESS_MAX:
+            break
+        _recent_alerts.popitem(last=False)
+
+
+def _recently_alerted(key, now):
+    """True if key was alerted within ALERT_SUPPRESS_SECONDS; otherwise record it."""
+    if key in _recent_alerts:
+        return True
+    _recent_alerts[key] = now
+    return False
+
 
 def check_liquidations():
+    conn = None
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Query positions from flxn_tsla_positions table
-            cur.execute(f'''
-                SELECT 
-                    address,
-                    market,
-                    position_size,
-                    entry_price,
-                    liquidation_price,
-                    margin_used,
-                    position_value,
-                    unrealized_pnl,
-                    return_on_equity,
-                    leverage_type,
-                    leverage_value,
-                    leverage_raw_usd,
-                    account_value,
-                    total_margin_used,
-                    withdrawable,
-                    last_updated
-                FROM user_positions.flxn_tsla_positions
-                WHERE position_value IS NOT NULL 
-                  AND position_size IS NOT NULL
-                  AND position_size != 0
-                  AND liquidation_price IS NOT NULL
-                  AND ABS(position_value) >= %s
-                ORDER BY ABS(position_value) DESC;
-            ''', (MIN_POSITION_VALUE,))
-            
-            positions = cur.fetchall()
-            
-            if not positions:
-                print(f"No positions found with value >= ${MIN_POSITION_VALUE:,}")
-                return
-            
-            print(f"Found {len(positions)} positions with value >= ${MIN_POSITION_VALUE:,}")
+        conn = get_pool().getconn()
+        # Server-side cursor: rows stream in POSITIONS_FETCH_SIZE batches
+        # instead of the whole result being buffered client-side first
+        with conn.cursor(name="liquidation_positions") as cur:
+            cur.itersize = POSITIONS_FETCH_SIZE
+            # numeric columns arrive as floats; no per-value Decimal
+            register_type(DEC2FLOAT, cur)
+            # Only positions within LIQUIDATION_DISTANCE of their liquidation
+            # price come back. The test is multiplied through so the per-row
+            # filter never divides: with mark = |value| / |size|,
+            #   |mark - liq| <= d * mark  <=>  ||value| - liq * |size|| <= d * |value|
+            # Divisions are left to the select list, which only runs for the
+            # rows that come back; columns are in ALERT_FIELDS order.
+            cur.execute('''
+                SELECT
+                    p.address,
+                    v.abs_value,
+                    v.abs_value / ABS(p.position_size) AS mark_px,
+                    p.liquidation_price,
+                    ABS(v.liq_gap) / v.abs_value * 100 AS distance_pct,
+                    p.leverage_value,
+                    v.unrealized_pnl
+                FROM user_positions.flxn_tsla_positions p
+                CROSS JOIN LATERAL (
+                    SELECT
+                        ABS(p.position_value) AS abs_value,
+                        ABS(p.position_value) - p.liquidation_price * ABS(p.position_size) AS liq_gap,
+                        COALESCE(p.unrealized_pnl, 0) AS unrealized_pnl
+                ) v
+                WHERE p.position_value IS NOT NULL 
+                  AND p.position_size IS NOT NULL
+                  AND p.position_size != 0
+                  AND p.liquidation_price IS NOT NULL
+                  AND ABS(p.position_value) >= %(min_value)s
+                  AND p.position_value != 0
+                  AND ABS(v.liq_gap) <= %(max_distance)s * v.abs_value
+                -- Same expression as the positions_abs_value index, so rows
+                -- come off it already ordered and the cursor keeps streaming
+                ORDER BY ABS(p.position_value) DESC;
+            ''', POSITIONS_QUERY_PARAMS)
             
             alerts = []
-            for position in positions:
-                address = position['address']
-                position_size = float(position['position_size'])
-                position_value = float(position['position_value'])
-                liquidation_price = float(position['liquidation_price'])
-                
-                # Calculate mark price from position_value / position_size
-                mark_px = abs(position_value / position_size) if position_size != 0 else 0
-                
-                if mark_px == 0:
-                    print(f"Warning: Invalid mark price for address {address[:6]}...{address[-4:]}")
+            suppressed = 0
+            now = time.monotonic()
+            _expire_recent_alerts(now)
+            # Largest position first, straight off the streaming cursor
+            for row in cur:
+                fields = dict(zip(ALERT_FIELDS, row))
+                if _recently_alerted((fields["address"], round(fields["distance_pct"])), now):
+                    suppressed += 1
                     continue
-                
-                # Calculate distance to liquidation price as percentage
-                distance_to_liquidation = abs(mark_px - liquidation_price) / mark_px
-                
-                # Alert if within 10% of liquidation price
-                if distance_to_liquidation <= 0.1:
-                    distance_percentage = distance_to_liquidation * 100
-                    
-                    # Get additional position details
-                    margin_used = float(position['margin_used']) if position['margin_used'] else 0
-                    unrealized_pnl = float(position['unrealized_pnl']) if position['unrealized_pnl'] else 0
-                    leverage_value = position['leverage_value']
-                    entry_price = float(position['entry_price']) if position['entry_price'] else 0
-                    
-                    alert_msg = (
-                        f"LIQUIDATION WARNING!\n"
-                        f"Address: {address}\n"
-                        f"Position Value: ${abs(position_value):,.2f}\n"
-                        f"Mark Price: ${mark_px:.2f}\n"
-                        f"Liquidation Price: ${liquidation_price:.2f}\n"
-                        f"Distance to Liquidation: {distance_percentage:.2f}%\n"
-                        f"Leverage: {leverage_value}x\n"
-                        f"Unrealized PnL: ${unrealized_pnl:+,.2f}"
-                    )
-                    
-                    alerts.append(alert_msg)
-                    print(f"\n{alert_msg}")
+                alerts.append(LIQUIDATION_ALERT_TMPL.format_map(fields))
+                logger.info("%s", alerts[-1])
             
             if alerts:
                 header = (
                     f"{len(alerts)} POSITION(S) APPROACHING LIQUIDATION\n"
                     f"Timestamp: {datetime.now()}\n\n"
                 )
-                full_msg = header + "\n".join(alerts)
-                send_telegram_alert(full_msg)
-            else:
-                print(f"No positions at risk of liquidation.")
+                send_telegram_alert(header + "\n".join(alerts))
+            if suppressed:
+                logger.info("%d repeat alert(s) suppressed (within %ss)", suppressed, ALERT_SUPPRESS_SECONDS)
+            elif not alerts:
+                logger.info("No positions at risk of liquidation.")
             
-            print(f"\n--- Summary ---")
-            print(f"Total positions monitored: {len(positions)}")
-            print(f"Positions at risk: {len(alerts)}")
-            print(f"Alert threshold: 10% distance to liquidation")
-            print(f"Check completed at {datetime.now()}\n")
+            logger.info(
+                "Positions at risk: %d (threshold: %.0f%% distance to liquidation)",
+                len(alerts), LIQUIDATION_DISTANCE * 100,
+            )
             
+    except (psycopg2.InterfaceError, psycopg2.OperationalError) as e:
+        # Dropped connection: discard it so the next tick gets a fresh one
+        logger.warning("Database connection lost: %s", e)
+        send_developer_alert(f"liquidation_alert.py: Database error: {e}")
+        if conn is not None:
+            get_pool().putconn(conn, close=True)
+            conn = None
     except psycopg2.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         send_developer_alert(f"liquidation_alert.py: Database error: {e}")
     except Exception as e:
-        print(f"Error checking liquidations: {e}")
+        logger.error("Error checking liquidations: %s", e)
         send_developer_alert(f"liquidation_alert.py: Error checking liquidations: {e}")
     finally:
-        if 'conn' in locals():
-            conn.close()
+        if conn is not None:
+            get_pool().putconn(conn)
 
 if __name__ == "__main__":
-    print("Starting liquidation monitoring...")
-    print(f"Monitoring positions >= ${MIN_POSITION_VALUE:,}")
-    print(f"Table: user_positions.flxn_tsla_positions")
-    print(f"Alert condition: abs(mark_price - liquidation_price) / mark_price <= 0.1")
-    print(f"Mark price formula: position_value / position_size")
-    print(f"Alert triggers when position is within 10% of liquidation price")
-    print(f"Check interval: {CHECK_INTERVAL} seconds\n")
+    configure_logging()
+    logger.info("Starting liquidation monitoring...")
+    logger.info("Monitoring positions >= $%s", f"{MIN_POSITION_VALUE:,}")
+    logger.info("Table: user_positions.flxn_tsla_positions")
+    logger.info("Alert condition: abs(mark_price - liquidation_price) / mark_price <= %s", LIQUIDATION_DISTANCE)
+    logger.info("Mark price formula: position_value / position_size")
+    logger.info("Check interval: %s seconds", CHECK_INTERVAL)
     
-    while True:
-        try:
-            check_liquidations()
-        except KeyboardInterrupt:
-            send_developer_alert("liquidation_alert.py: Stopped.")
-            print("\nMonitoring stopped by user.")
-            break
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-            send_developer_alert(f"liquidation_alert.py: Unexpected error: {e}")
-            time.sleep(60)
-            continue
-        
-        print(f"Waiting {CHECK_INTERVAL} seconds until next check...")
-        time.sleep(CHECK_INTERVAL)
+    # Pooled connections stay open between ticks; close them on the way out
+    atexit.register(close_pool)
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    try:
+        while not stop_event.is_set():
+            try:
+                check_liquidations()
+            except Exception as e:
+                logger.error("Unexpected error: %s", e)
+                send_developer_alert(f"liquidation_alert.py: Unexpected error: {e}")
+                stop_event.wait(60)
+                continue
+            
+            logger.debug("Waiting %s seconds until next check...", CHECK_INTERVAL)
+            stop_event.wait(CHECK_INTERVAL)
+        send_developer_alert("liquidation_alert.py: Stopped (SIGTERM).")
+        logger.info("Monitoring stopped by SIGTERM.")
+    except KeyboardInterrupt:
+        stop_event.set()
+        send_developer_alert("liquidation_alert.py: Stopped.")
+        logger.info("Monitoring stopped by user.")
@@ -0,0 +1,29 @@
+"""Process-wide logging that never blocks the monitor loops on stdout.
+
+Records go onto an in-memory queue through a QueueHandler; one QueueListener
+thread does the actual writes. LOG_LEVEL picks the level (default INFO).
+"""
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+_listener = None
+
+
+def configure_logging(fmt="[%(asctime)s] %(message)s", datefmt="%H:%M:%S"):
+    """Route the root logger through a background writer; later calls are no-ops."""
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt, datefmt))
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(QueueHandler(records))
+    _listener = QueueListener(records, handler)
+    _listener.start()
+    # Writes out whatever is still queued before the process exits
+    atexit.register(_listener.stop)
@@ -1,8 +1,68 @@
-"""Main entry point for Felix Monitoring."""
+"""Main entry point for Felix Monitoring.
+
+Runs the polling monitors in one process on a single asyncio event loop.
+Each check does blocking I/O (requests / psycopg2), so it runs in a worker
+thread; the loop only owns the schedule, so one monitor's slow HTTP or DB
+call overlaps the others' sleeps instead of delaying them. Running them
+together also means one Postgres pool (db), one HTTPS session
+(http_client), one Telegram sender (notifier) and one metaAndAssetCtxs
+cache (hyperliquid_api) serve every monitor.
+"""
+import asyncio
+import logging
+
+import db
+import deviation_oracle_price
+import depth
+import funding_rate
+import impact_price_difference
+import liquidation_alert
+import oi_oicap
+from log_setup import configure_logging
+
+logger = logging.getLogger("main")
+
+# Back off this long after a check raises, as the standalone scripts do
+ERROR_RETRY_SECONDS = 60
+
+# (name, one-tick check, module for its interval and developer alerts)
+MONITORS = [
+    ("depth.py", depth.check_liquidity_depth, depth),
+    ("deviation_oracle_price.py", deviation_oracle_price.check_price_impact, deviation_oracle_price),
+    ("funding_rate.py", funding_rate.check_funding_rate, funding_rate),
+    ("impact_price_difference.py", impact_price_difference.check_volatility, impact_price_difference),
+    ("liquidation_alert.py", liquidation_alert.check_liquidations, liquidation_alert),
+    ("oi_oicap.py", oi_oicap.compare_once, oi_oicap),
+]
+
+
+async def run_monitor(name, check, module):
+    """Call check every module.CHECK_INTERVAL seconds, forever."""
+    while True:
+        try:
+            await asyncio.to_thread(check)
+        except Exception as e:
+            logger.error("Error in %s: %s", name, e)
+            await asyncio.to_thread(module.send_developer_alert, f"{name}: Error in monitoring loop: {e}")
+            await asyncio.sleep(ERROR_RETRY_SECONDS)
+            continue
+        await asyncio.sleep(module.CHECK_INTERVAL)
+
+
+async def run_all():
+    await asyncio.gather(*(run_monitor(*monitor) for monitor in MONITORS))
+
 
 def main():
     """Execute main monitoring logic."""
-    print("Hello from felix-monitoring!")
+    configure_logging()
+    logger.info("Starting %d monitors... Press Ctrl+C to stop.", len(MONITORS))
+    try:
+        asyncio.run(run_all())
+    except KeyboardInterrupt:
+        logger.info("Stopped by user.")
+    finally:
+        db.close_pool()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,28 @@
+-- Indexes for the depth.py and impact_price_difference.py window queries.
+--
+-- Table names match config.json (database.market_data_schema /
+-- database.market_data_table); adjust them if those keys change.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so apply
+-- this file with autocommit on:
+--     psql "$DATABASE_URL" -f migrations/001_market_data_indexes.sql
+
+-- depth.py: MAX(timestamp) lookup and "timestamp > last seen" range scans,
+-- answered index-only from the depth columns.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS md_ts_desc
+    ON market_data.flx_tsla_data (timestamp DESC)
+    INCLUDE (
+        bid_depth_5bps, ask_depth_5bps,
+        bid_depth_10bps, ask_depth_10bps,
+        bid_depth_50bps, ask_depth_50bps,
+        bid_depth_100bps, ask_depth_100bps
+    );
+
+-- impact_price_difference.py: latest complete row and its trailing hour.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS md_ts_desc_prices_complete
+    ON market_data.flx_tsla_data (timestamp DESC)
+    INCLUDE (impactpxs_bid, impactpxs_ask, oraclepx, markpx)
+    WHERE impactpxs_bid IS NOT NULL
+      AND impactpxs_ask IS NOT NULL
+      AND oraclepx IS NOT NULL
+      AND markpx IS NOT NULL;
@@ -0,0 +1,16 @@
+-- Index for the liquidation_alert.py positions scan.
+--
+-- The query filters on ABS(position_value) >= min_position_value and orders
+-- by ABS(position_value) DESC, so an expression index lets the planner
+-- range-scan the large positions instead of reading the whole table.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so apply
+-- this file with autocommit on:
+--     psql "$DATABASE_URL" -f migrations/002_positions_value_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS positions_abs_value
+    ON user_positions.flxn_tsla_positions (ABS(position_value) DESC)
+    WHERE position_value IS NOT NULL
+      AND position_size IS NOT NULL
+      AND position_size != 0
+      AND liquidation_price IS NOT NULL;
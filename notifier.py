@@ -0,0 +1,231 @@
+"""Background Telegram delivery so monitor loops never wait on the Bot API.
+
+Alerts are queued and posted by one daemon worker thread. Identical messages
+already waiting in the queue are dropped, which coalesces alert storms.
+Developer alerts jump ahead of market alerts, sends are paced to stay under
+Telegram's per-chat limits, and a 429 parks that chat's alerts for the
+retry_after the Bot API asks for while other chats keep flowing.
+"""
+import atexit
+import functools
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
+from http_client import TELEGRAM_SESSION
+
+try:
+    from orjson import dumps as json_dumps
+except ImportError:
+    from json import dumps as _dumps
+
+    def json_dumps(obj):
+        # bytes, like orjson, so bodies can be spliced together
+        return _dumps(obj, separators=(",", ":")).encode()
+
+logger = logging.getLogger("notifier")
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+ALERT_Q = queue.PriorityQueue()
+# Market alerts are dropped once this many alerts are waiting; developer
+# alerts are always queued
+MAX_QUEUED = 100
+# Lower sorts first
+PRIORITIES = {"Developer": 0}
+DEFAULT_PRIORITY = 1
+# Telegram allows about 1 message/second and 20 messages/minute per chat,
+# and 30 messages/second per bot
+CHAT_RATE_PER_SECOND = 1
+CHAT_RATE_PER_MINUTE = 20
+BOT_RATE_PER_SECOND = 30
+# Sends of one message, counting retries after a 429
+MAX_SEND_ATTEMPTS = 3
+# Seconds to keep delivering queued alerts once the process starts exiting
+FLUSH_TIMEOUT_SECONDS = 10
+
+_pending = set()
+_pending_lock = threading.Lock()
+_worker = None
+_worker_lock = threading.Lock()
+# FIFO order within a priority
+_seq = itertools.count()
+# Alerts held back by a 429, as (not_before, seq, item) on time.monotonic();
+# a heap touched only by the worker thread
+_deferred = []
+# chat_id -> time.monotonic() before which the Bot API asked us not to send
+_blocked_until = {}
+
+
+class RetryAfter(Exception):
+    """The Bot API answered 429; retry_after is the wait it asked for."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """rate tokens per second, bursting up to capacity; used by the worker only."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens < 1:
+            time.sleep((1 - self.tokens) / self.rate)
+            self.stamp = time.monotonic()
+            self.tokens = 1
+        self.tokens -= 1
+
+
+_bot_bucket = TokenBucket(BOT_RATE_PER_SECOND, BOT_RATE_PER_SECOND)
+_chat_buckets = {}
+
+
+def _wait_for_slot(chat_id):
+    buckets = _chat_buckets.get(chat_id)
+    if buckets is None:
+        buckets = _chat_buckets[chat_id] = (
+            TokenBucket(CHAT_RATE_PER_SECOND, CHAT_RATE_PER_SECOND),
+            TokenBucket(CHAT_RATE_PER_MINUTE / 60, CHAT_RATE_PER_MINUTE),
+        )
+    for bucket in buckets:
+        bucket.acquire()
+    _bot_bucket.acquire()
+
+
+@functools.lru_cache(maxsize=8)
+def _send_url(token):
+    # One URL per bot token, built once
+    return f"https://api.telegram.org/bot{token}/sendMessage"
+
+
+@functools.lru_cache(maxsize=8)
+def _body_prefix(chat_id):
+    # Everything before the text is fixed per chat; only the text is encoded per send
+    return b'{"chat_id":' + json_dumps(chat_id) + b',"text":'
+
+
+def send_message(token, chat_id, text):
+    """POST one message to the Bot API; raises RetryAfter on 429, else on HTTP errors."""
+    resp = TELEGRAM_SESSION.post(
+        _send_url(token),
+        data=_body_prefix(chat_id) + json_dumps(text) + b"}",
+        headers=JSON_HEADERS,
+        timeout=10,
+    )
+    if resp.status_code == 429:
+        try:
+            retry_after = resp.json()["parameters"]["retry_after"]
+        except (ValueError, KeyError, TypeError):
+            retry_after = int(resp.headers.get("Retry-After", 1))
+        raise RetryAfter(retry_after)
+    resp.raise_for_status()
+
+
+def _defer(not_before, item):
+    heapq.heappush(_deferred, (not_before, item[1], item))
+
+
+def _release_due():
+    """Move deferred alerts whose wait is over back into the queue."""
+    now = time.monotonic()
+    while _deferred and _deferred[0][0] <= now:
+        ALERT_Q.put(heapq.heappop(_deferred)[2])
+
+
+def _next_item():
+    """Next queued alert, waking when a deferred one falls due; None on timeout."""
+    _release_due()
+    timeout = max(_deferred[0][0] - time.monotonic(), 0) if _deferred else None
+    try:
+        return ALERT_Q.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+def _drain():
+    while True:
+        item = _next_item()
+        if item is None:
+            continue
+        priority, seq, attempt, token, chat_id, text, label = item
+        kept = False
+        try:
+            blocked_until = _blocked_until.get(chat_id, 0)
+            if blocked_until > time.monotonic():
+                # The chat is still inside a retry_after; park the alert and
+                # move on to alerts for other chats
+                _defer(blocked_until, item)
+                kept = True
+                continue
+            _wait_for_slot(chat_id)
+            send_message(token, chat_id, text)
+            logger.info("%s alert sent.", label)
+        except RetryAfter as e:
+            if attempt < MAX_SEND_ATTEMPTS:
+                logger.warning("Telegram rate limit hit, retrying %s alert in %ss", label.lower(), e.retry_after)
+                # No sleep here: the alert waits in _deferred while the worker
+                # keeps serving the queue, so a developer alert is not stuck
+                # behind a market chat's rate limit
+                not_before = time.monotonic() + e.retry_after
+                _blocked_until[chat_id] = not_before
+                # Keep the original seq so the retry stays ahead of later
+                # alerts for the same chat
+                _defer(not_before, (priority, seq, attempt + 1, token, chat_id, text, label))
+                kept = True
+            else:
+                logger.error("Failed to send %s alert: %s", label.lower(), e)
+        except Exception as e:
+            logger.error("Failed to send %s alert: %s", label.lower(), e)
+        finally:
+            if not kept:
+                with _pending_lock:
+                    _pending.discard((chat_id, text))
+            ALERT_Q.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_drain, name="telegram-notifier", daemon=True)
+            _worker.start()
+
+
+def enqueue(token, chat_id, text, label="Market"):
+    """Queue text for delivery; returns False if it was dropped."""
+    priority = PRIORITIES.get(label, DEFAULT_PRIORITY)
+    if priority >= DEFAULT_PRIORITY and ALERT_Q.qsize() >= MAX_QUEUED:
+        logger.warning("Alert queue full, dropping %s alert", label.lower())
+        return False
+    key = (chat_id, text)
+    with _pending_lock:
+        if key in _pending:
+            return False
+        _pending.add(key)
+    _ensure_worker()
+    ALERT_Q.put((priority, next(_seq), 1, token, chat_id, text, label))
+    return True
+
+
+def flush(timeout=FLUSH_TIMEOUT_SECONDS):
+    """Wait up to timeout seconds for queued alerts to be delivered."""
+    deadline = time.monotonic() + timeout
+    while (ALERT_Q.unfinished_tasks or _deferred) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+# Deliver "stopped"/"crashed" alerts queued on the way out
+atexit.register(flush)
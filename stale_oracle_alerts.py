@@ -1,12 +1,26 @@
 #!/usr/bin/env python3
-import os, time, json, traceback
-from collections import deque
-from datetime import datetime
-from urllib import request, parse
+import os, re, time, heapq, select, struct, threading, traceback, functools
+import ctypes, ctypes.util
+from collections import OrderedDict
+from itertools import chain
+from operator import itemgetter
+from datetime import datetime, timedelta, timezone
 from watchdog.observers import Observer
-from watchdog.events import PatternMatchingEventHandler
+from watchdog.events import (FileCreatedEvent, FileDeletedEvent, FileModifiedEvent, FileMovedEvent,
+                             PatternMatchingEventHandler)
 from dotenv import load_dotenv
 from config_loader import load_config
+import notifier
+
+try:
+    from orjson import loads as json_loads, JSONDecodeError
+except ImportError:  # stdlib fallback; also accepts bytes
+    from json import loads as json_loads, JSONDecodeError
+
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    _parse_iso = None
 
 load_dotenv()
 config = load_config()
@@ -21,9 +35,29 @@ DEVELOPER_TELEGRAM_CHAT_ID = os.getenv("DEVELOPER_TELEGRAM_CHAT_ID")
 
 MARKETS_STR = os.getenv("MARKETS", config.symbols['primary_coin'])
 MARKETS = set(s.strip() for s in MARKETS_STR.split(",") if s.strip()) if MARKETS_STR else None
+_MARKETS_FS = frozenset(MARKETS) if MARKETS is not None else None
+
+# Skews are compared as integer microseconds
+THRESHOLD_US = int(THRESHOLD_SECONDS * 1_000_000)
 
 READ_EXISTING_AT_START = script_config['read_existing_at_start']
 READ_NEW_FILES_FROM_START = script_config['read_new_files_from_start']
+MAX_OPEN_FILES = 64
+# "inotify" reads kernel events for the focus hour directly (watchdog where
+# inotify is unavailable), "watchdog" always uses watchdog's native observer,
+# and "polling" rescans only the focus hour every POLL_INTERVAL seconds, for
+# network mounts without inotify
+WATCH_MODE = os.getenv("WATCH_MODE", "inotify").lower()
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "30"))
+# Alerted block numbers remembered for dedup; oldest are forgotten first
+ALERTED_BLOCKS_MAX = 4096
+FOCUS_RECHECK_SECONDS = script_config.get('focus_recheck_seconds', 30)
+# Alerts raised within this window go out together as one message
+ALERT_DEBOUNCE_SECONDS = script_config.get('alert_debounce_seconds', 0.5)
+TELEGRAM_MAX_CHARS = 4096
+# Offenders listed per alert, worst first
+MAX_LISTED_OFFENDERS = 20
+ALERT_SEPARATOR = "\n\n"
 
 def _now():
     return time.strftime("%H:%M:%S")
@@ -32,28 +66,39 @@ def send_telegram_alert(text: str) -> bool:
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         print(f"[{_now()}] TELEGRAM creds missing; skipping alert.")
         return False
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    data = parse.urlencode({"chat_id": TELEGRAM_CHAT_ID, "text": text}).encode()
-    try:
-        with request.urlopen(request.Request(url, data=data), timeout=10) as resp:
-            return 200 <= resp.status < 300
-    except Exception as e:
-        print(f"[{_now()}] Market alert send failed: {e}")
-        return False
+    # Queued; the notifier thread posts over a kept-alive session
+    return notifier.enqueue(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, text, "Market")
 
 def send_developer_alert(text: str) -> bool:
     if not DEVELOPER_TELEGRAM_BOT_TOKEN or not DEVELOPER_TELEGRAM_CHAT_ID:
         return False
-    url = f"https://api.telegram.org/bot{DEVELOPER_TELEGRAM_BOT_TOKEN}/sendMessage"
-    data = parse.urlencode({"chat_id": DEVELOPER_TELEGRAM_CHAT_ID, "text": text}).encode()
-    try:
-        with request.urlopen(request.Request(url, data=data), timeout=10) as resp:
-            return 200 <= resp.status < 300
-    except Exception as e:
-        print(f"[{_now()}] Developer alert send failed: {e}")
-        return False
+    return notifier.enqueue(DEVELOPER_TELEGRAM_BOT_TOKEN, DEVELOPER_TELEGRAM_CHAT_ID, text, "Developer")
 
+def pack_alerts(texts):
+    """Join alert texts into as few messages as fit Telegram's length limit."""
+    out, cur = [], ""
+    for t in texts:
+        if cur and len(cur) + len(ALERT_SEPARATOR) + len(t) > TELEGRAM_MAX_CHARS:
+            out.append(cur); cur = t
+        else:
+            cur = cur + ALERT_SEPARATOR + t if cur else t
+    if cur: out.append(cur)
+    return out
+
+# block_time and last_update_time values repeat heavily across records and
+# symbols, so most calls are a cache hit; results are immutable datetimes
+@functools.lru_cache(maxsize=4096)
 def parse_iso_ts(ts: str) -> datetime:
+    # Compiled parser when installed; anything it rejects takes the Python path
+    if _parse_iso is not None:
+        try:
+            return _parse_iso(ts)
+        except ValueError:
+            pass
+    # Fast path for the plain "YYYY-MM-DDTHH:MM:SSZ" shape
+    if len(ts) == 20 and ts[-1] == "Z":
+        return datetime(int(ts[:4]), int(ts[5:7]), int(ts[8:10]),
+                        int(ts[11:13]), int(ts[14:16]), int(ts[17:19]), tzinfo=timezone.utc)
     s = ts
     if s.endswith("Z"): s = s[:-1] + "+00:00"
     if "." in s:
@@ -65,36 +110,64 @@ def parse_iso_ts(ts: str) -> datetime:
         s = f"{head}.{frac}{tz}"
     return datetime.fromisoformat(s)
 
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+@functools.lru_cache(maxsize=4096)
+def parse_iso_us(ts: str) -> int:
+    """Microseconds since the epoch; naive stamps are taken as UTC."""
+    dt = parse_iso_ts(ts)
+    return (dt - (_EPOCH_NAIVE if dt.tzinfo is None else _EPOCH_UTC)) // _ONE_US
+
+_ORACLE_KEYS = ("coin_to_mark_px", "coin_to_oracle_px", "coin_to_external_perp_px")
+
 def collect_last_update_times(record: dict):
     out = []
     events = record.get("events") or []
     if not events: return out
     oracle = events[0].get("oracle_pxs", {})
-    for key in ("coin_to_mark_px","coin_to_oracle_px","coin_to_external_perp_px"):
-        for sym, obj in oracle.get(key, []):
-            if MARKETS is not None and sym not in MARKETS:
-                continue
-            ts = obj.get("last_update_time") or obj.get("last_updated_time")
-            if isinstance(ts, str) and "T" in ts: out.append((sym, ts))
+    # All three categories in one pass; offenders are ordered later anyway
+    pairs = chain.from_iterable([oracle.get(k, ()) for k in _ORACLE_KEYS])
+    markets = _MARKETS_FS
+    # The filter decision is made once per record, not once per symbol
+    if markets is not None:
+        pairs = [p for p in pairs if p[0] in markets]
+    out_append = out.append
+    for sym, obj in pairs:
+        ts = obj.get("last_update_time") or obj.get("last_updated_time")
+        # Cheap shape check ("YYYY-MM-DDT...") so malformed stamps never
+        # reach the parser
+        if type(ts) is str and len(ts) >= 19 and ts[4] == "-" and ts[7] == "-" and ts[10] == "T":
+            out_append((sym, ts))
     return out
 
-def check_record(record: dict, source_path: str, alerted_blocks: set):
+_SKEW = itemgetter(1)
+
+def _lut_us(ts: str):
+    """parse_iso_us, or None for a well-shaped but impossible date."""
+    try:
+        return parse_iso_us(ts)
+    except ValueError:
+        return None
+
+def check_record(record: dict, source_path: str, alerted_blocks: OrderedDict, alert=send_telegram_alert):
     block_time = record.get("block_time")
     if not block_time: return
     block_number = record.get("block_number", "unknown")
-    if block_number in alerted_blocks: return
+    if block_number in alerted_blocks:
+        alerted_blocks.move_to_end(block_number); return
     ups = collect_last_update_times(record)
     if not ups: return
-    block_dt = parse_iso_ts(block_time)
-    offenders = []
-    for sym, lut in ups:
-        try:
-            dsec = abs((block_dt - parse_iso_ts(lut)).total_seconds())
-            if dsec > THRESHOLD_SECONDS: offenders.append((sym, dsec, lut))
-        except: pass
+    block_us = parse_iso_us(block_time)
+    offenders = [(sym, d, lut) for sym, lut in ups
+                 for us in (_lut_us(lut),) if us is not None
+                 for d in (abs(block_us - us),) if d > THRESHOLD_US]
     if not offenders: return
-    offenders.sort(key=lambda x: x[1], reverse=True)
-    worst = offenders[0][1]
+    # Only the listed offenders need ordering; select them with a bounded heap
+    top = heapq.nlargest(MAX_LISTED_OFFENDERS, offenders, key=_SKEW)
+    # Skews stay integer microseconds until formatted
+    worst = top[0][1] / 1e6
     lines = [
         "ALERT: HIP3 Oracle Update Skew Detected\n",
         f"Block: {block_number}",
@@ -104,159 +177,448 @@ def check_record(record: dict, source_path: str, alerted_blocks: set):
         f"Total Stale Markets: {len(offenders)}\n",
         "Market Name:",
     ]
-    for i, (symbol, dsec, lut) in enumerate(offenders[:20], 1):
-        lines.append(f"  {i}. {symbol} - Skew: {dsec:.3f}s (last_update: {lut})")
-    if len(offenders) > 20:
-        lines.append(f"\n... and {len(offenders) - 20} more")
+    lines += [f"  {i}. {symbol} - Skew: {d / 1e6:.3f}s (last_update: {lut})"
+              for i, (symbol, d, lut) in enumerate(top, 1)]
+    if len(offenders) > MAX_LISTED_OFFENDERS:
+        lines.append(f"\n... and {len(offenders) - MAX_LISTED_OFFENDERS} more")
     msg = "\n".join(lines)
-    ok = send_telegram_alert(msg)
-    if ok: 
-        alerted_blocks.add(block_number)
-    print(f"[{_now()}] alert {'sent' if ok else 'suppressed'} for block {block_number} ({source_path})")
+    ok = alert(msg)
+    if ok:
+        alerted_blocks[block_number] = None
+        if len(alerted_blocks) > ALERTED_BLOCKS_MAX:
+            alerted_blocks.popitem(last=False)
+    print(f"[{_now()}] alert {'queued' if ok else 'suppressed'} for block {block_number} ({source_path})")
+
+def _latest_numbered_dir(parent, width):
+    """Name of the highest all-digit subdirectory of the given width, or None."""
+    # scandir's DirEntry answers is_dir from the directory read, no stat each
+    with os.scandir(parent) as it:
+        names = [e.name for e in it
+                 if len(e.name) == width and e.name.isdigit() and e.is_dir(follow_symlinks=False)]
+    return max(names) if names else None
 
 def find_latest_hour_path(root):
     """Find the most recent hourly directory path."""
     print(f"[{_now()}] scan date dirs under {root}")
-    date_dirs = [d for d in os.listdir(root) if len(d)==8 and d.isdigit() and os.path.isdir(os.path.join(root,d))]
-    if not date_dirs: return None
-    date_dirs.sort()
-    latest_date = os.path.join(root, date_dirs[-1])
+    date = _latest_numbered_dir(root, 8)
+    if not date: return None
+    latest_date = os.path.join(root, date)
     print(f"[{_now()}] latest date -> {latest_date}")
-    hour_dirs = [h for h in os.listdir(latest_date) if len(h)==2 and h.isdigit() and os.path.isdir(os.path.join(latest_date,h))]
-    if not hour_dirs: return None
-    hour_dirs.sort()
-    latest_hour = os.path.join(latest_date, hour_dirs[-1])
+    hour = _latest_numbered_dir(latest_date, 2)
+    if not hour: return None
+    latest_hour = os.path.join(latest_date, hour)
     print(f"[{_now()}] latest hour -> {latest_hour}")
     return latest_hour
 
+def _mtime(entry):
+    try:
+        return entry.stat().st_mtime
+    except FileNotFoundError:
+        return -1.0
+
 def find_latest_file_in(dir_path):
     """Find the most recently modified file in directory."""
-    latest_p, latest_mt = None, -1.0
-    for fn in os.listdir(dir_path):
-        p = os.path.join(dir_path, fn)
-        if not os.path.isfile(p): continue
-        try:
-            mt = os.path.getmtime(p)
-            if mt > latest_mt: latest_p, latest_mt = p, mt
-        except FileNotFoundError:
-            pass
+    with os.scandir(dir_path) as it:
+        latest = max((e for e in it if e.is_file()), key=_mtime, default=None)
+    latest_p = latest.path if latest is not None else None
     if latest_p:
         print(f"[{_now()}] latest file in {dir_path} = {latest_p}")
     else:
         print(f"[{_now()}] no files in {dir_path}")
     return latest_p
 
+# moved/deleted are kept so cached fds are carried or closed
+_HANDLED_EVENTS = frozenset(("created", "modified", "moved", "deleted"))
+
 class TailHandler(PatternMatchingEventHandler):
     """File watcher handler that monitors and processes oracle update files."""
     def __init__(self, root: str):
         super().__init__(patterns=["*"], ignore_patterns=None, ignore_directories=True, case_sensitive=True)
         self.root = os.path.abspath(root)
         self.offsets, self.buffers = {}, {}
-        self.alerted_blocks = set()
-        self.alerted_order = deque(maxlen=1000)
+        self._fds = OrderedDict()  # path -> fd, most recently read last
+        # Guards offsets/buffers/_fds: watcher events and the main loop's
+        # refocus both read and rewrite them. Reentrant because refocus and the
+        # event handlers call _process_path with it held.
+        self._lock = threading.RLock()
+        self.alerted_blocks = OrderedDict()  # LRU of alerted block numbers
+        # Alert texts waiting out the debounce window; check_record runs on the
+        # watchdog thread while the main loop flushes
+        self._alerts, self._alerts_since = [], 0.0
+        self._alerts_lock = threading.Lock()
+        # Byte-level prefilter: a line naming none of MARKETS cannot produce an
+        # alert, so it is dropped before decoding. One alternation regex scans
+        # the line once however many markets are configured; false positives
+        # (a symbol elsewhere in the line) still go through the full check.
+        self._market_probe = (
+            re.compile(b"|".join(re.escape(m.encode()) for m in sorted(MARKETS))).search
+            if MARKETS else None
+        )
         print(f"[{_now()}] register existing files (tail-only={not READ_EXISTING_AT_START})")
-        for dp, _, files in os.walk(self.root):
-            print(f"[{_now()}] DIR {dp}")
-            for fn in files:
-                p = os.path.join(dp, fn)
-                if not os.path.isfile(p): continue
-                try: size = os.path.getsize(p)
+        # Only the latest hour can hold fresh oracle updates; older hours are
+        # neither registered nor watched
+        self.focus_dir = find_latest_hour_path(self.root)
+        self.focus_file = None
+        if self.focus_dir:
+            self._register_dir(self.focus_dir, READ_EXISTING_AT_START)
+            self.focus_file = find_latest_file_in(self.focus_dir)
+            if self.focus_file:
+                print(f"[{_now()}] focus file {self.focus_file} start_offset={self.offsets[self.focus_file]}")
+
+    def _register_dir(self, d: str, from_start: bool):
+        print(f"[{_now()}] DIR {d}")
+        with os.scandir(d) as it:
+            entries = [e for e in it if e.is_file()]
+        for e in entries:
+            p = e.path
+            try: size = e.stat().st_size
+            except FileNotFoundError: continue
+            start = 0 if from_start else size
+            self.offsets[p] = start; self.buffers[p] = bytearray()
+            print(f"[{_now()}]  + {p} size={size} offset={start}")
+
+    def refocus(self):
+        """Move to a newer hour directory if one appeared; return it, else None.
+
+        The old hour's files are drained one last time and forgotten. Files
+        already in the new hour were written while it was not yet watched, so
+        they are read from offset 0 whatever READ_NEW_FILES_FROM_START says;
+        starting at their size would drop up to a recheck interval of updates.
+        """
+        latest = find_latest_hour_path(self.root)
+        if not latest or latest == self.focus_dir:
+            return None
+        with self._lock:
+            old = self.focus_dir
+            print(f"[{_now()}] hour rollover {old} -> {latest}")
+            self.focus_dir = latest
+            if old:
+                for p in [p for p in self.offsets if os.path.dirname(p) == old]:
+                    self._process_path(p)
+                    self._close_fd(p)
+                    self.offsets.pop(p, None); self.buffers.pop(p, None)
+            self._register_dir(latest, True)
+            self.focus_file = find_latest_file_in(latest)
+            for p in [p for p in self.offsets if os.path.dirname(p) == latest]:
+                self._process_path(p)
+        return latest
+
+    def poll(self):
+        """Scan the focus hour once and feed changed files through the event handlers."""
+        if not self.focus_dir: return
+        try:
+            with os.scandir(self.focus_dir) as it:
+                entries = [e for e in it if e.is_file()]
+        except FileNotFoundError:
+            return
+        with self._lock:
+            for e in entries:
+                try: size = e.stat().st_size
                 except FileNotFoundError: continue
-                start = 0 if READ_EXISTING_AT_START else size
-                self.offsets[p] = start; self.buffers[p] = ""
-                print(f"[{_now()}]  + {p} size={size} offset={start}")
-        latest_hour = find_latest_hour_path(self.root)
-        self.focus_dir = latest_hour
-        self.focus_file = find_latest_file_in(latest_hour) if latest_hour else None
-        if self.focus_file:
-            size = os.path.getsize(self.focus_file)
-            self.offsets[self.focus_file] = 0 if READ_EXISTING_AT_START else size
-            self.buffers.setdefault(self.focus_file, "")
-            print(f"[{_now()}] focus file {self.focus_file} start_offset={self.offsets[self.focus_file]}")
+                off = self.offsets.get(e.path)
+                if off is None:
+                    self.on_created(FileCreatedEvent(e.path))
+                elif size != off:
+                    self.on_modified(FileModifiedEvent(e.path))
+
+    def dispatch(self, event):
+        # inotify also reports opens/closes, and a stray write elsewhere under
+        # ROOT can never matter; only focus-hour file events get through
+        if event.event_type not in _HANDLED_EVENTS:
+            return
+        if os.path.dirname(event.src_path) != self.focus_dir:
+            return
+        super().dispatch(event)
+
+    def _queue_alert(self, text: str) -> bool:
+        with self._alerts_lock:
+            if not self._alerts: self._alerts_since = time.monotonic()
+            self._alerts.append(text)
+        return True
+
+    def flush_alerts(self, force: bool = True):
+        """Hand waiting alerts to the notifier, packed into as few messages as fit."""
+        with self._alerts_lock:
+            if not self._alerts: return
+            if not force and time.monotonic() - self._alerts_since < ALERT_DEBOUNCE_SECONDS: return
+            texts, self._alerts = self._alerts, []
+        for msg in pack_alerts(texts):
+            if not send_telegram_alert(msg):
+                print(f"[{_now()}] alert batch of {len(msg)} chars dropped")
+
+    def _fd_for(self, path: str) -> int:
+        fd = self._fds.get(path)
+        if fd is None:
+            fd = self._fds[path] = os.open(path, os.O_RDONLY)
+            if len(self._fds) > MAX_OPEN_FILES:
+                _, old_fd = self._fds.popitem(last=False)
+                os.close(old_fd)
+        else:
+            self._fds.move_to_end(path)
+        return fd
+
+    def _close_fd(self, path: str):
+        fd = self._fds.pop(path, None)
+        if fd is not None:
+            os.close(fd)
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
 
     def _read_new_lines(self, path: str):
         try:
             last_off = self.offsets.get(path, 0)
-            size = os.path.getsize(path)
+            # The fd stays open across modify events; fstat needs no path lookup
+            fd = self._fd_for(path)
+            size = os.fstat(fd).st_size
             if size < last_off:
                 print(f"[{_now()}] rotation/truncate {path} {last_off}->{size}; reset to 0")
+                # A rotated path may be a new inode; reopen rather than trust the old fd
+                self._close_fd(path)
+                fd = self._fd_for(path)
+                size = os.fstat(fd).st_size
                 last_off = 0
-            with open(path, "r") as f:
-                f.seek(last_off); chunk = f.read(); new_off = f.tell()
-                self.offsets[path] = new_off
-                print(f"[{_now()}] READ {path}: {last_off}->{new_off} bytes={len(chunk)}")
+            # pread takes the offset directly; no seek, no text decoding
+            chunk = os.pread(fd, size - last_off, last_off)
+            new_off = last_off + len(chunk)
+            self.offsets[path] = new_off
+            print(f"[{_now()}] READ {path}: {last_off}->{new_off} bytes={len(chunk)}")
         except FileNotFoundError:
             print(f"[{_now()}] disappeared before read: {path}")
+            self._close_fd(path)
             return
-        buf = self.buffers.get(path, ""); data = buf + (chunk or "")
-        if not data:
+        buf = self.buffers.get(path)
+        if buf is None:
+            buf = self.buffers[path] = bytearray()
+        buf.extend(chunk)
+        if not buf:
             print(f"[{_now()}] no data for {path}"); return
-        lines = data.splitlines()
-        if not data.endswith(("\n", "\r")):
-            self.buffers[path] = lines[-1] if lines else data
-            print(f"[{_now()}] keep partial buffer for {path}: {len(self.buffers[path])} chars")
-            lines = lines[:-1] if lines else []
-        else:
-            self.buffers[path] = ""
-        for line in lines:
-            yield line
+        # Everything up to the last newline is complete; the tail stays in place
+        cut = buf.rfind(b"\n")
+        if cut < 0:
+            print(f"[{_now()}] keep partial buffer for {path}: {len(buf)} bytes")
+            return
+        to_parse = bytes(buf[:cut])
+        del buf[:cut + 1]
+        if buf:
+            print(f"[{_now()}] keep partial buffer for {path}: {len(buf)} bytes")
+        yield from to_parse.split(b"\n")
 
     def _process_path(self, path: str):
-        if not os.path.isfile(path):
-            return
-        for line in self._read_new_lines(path):
-            s = line.strip()
-            if not s:
-                continue
-            if not (s.startswith("{") or s.startswith("[")):
-                print(f"[{_now()}] skip non-JSON line in {path}: {s[:80]!r}")
-                continue
-            try:
-                record = json.loads(s)
-            except json.JSONDecodeError:
-                self.buffers[path] = self.buffers.get(path, "") + s
-                print(f"[{_now()}] mid-write JSON at {path}; buffer size={len(self.buffers[path])}")
-                continue
-            try:
-                check_record(record, path, self.alerted_blocks)
-            except Exception:
-                print(f"[{_now()}] error in check_record for {path}")
-                traceback.print_exc()
+        with self._lock:
+            # A cached fd still reads a file that was renamed away or deleted
+            if path not in self._fds and not os.path.isfile(path):
+                return
+            # Lines come from one split of the read. Lines that start with
+            # "{" or "[" are not stripped: the decoder ignores a trailing \r
+            for s in self._read_new_lines(path):
+                if not s:
+                    continue
+                c = s[0]
+                if c != 0x7B and c != 0x5B:  # "{" / "["
+                    # Only lines not already starting a JSON value pay for a
+                    # strip, so leading whitespace is still accepted
+                    s = s.strip()
+                    if not s:
+                        continue
+                    if s[0] != 0x7B and s[0] != 0x5B:
+                        print(f"[{_now()}] skip non-JSON line in {path}: {s[:80]!r}")
+                        continue
+                if self._market_probe is not None and self._market_probe(s) is None:
+                    continue
+                try:
+                    # Raw bytes straight into the decoder; no str round trip
+                    record = json_loads(s)
+                except JSONDecodeError:
+                    # Only bytes after the last newline are buffered; a complete
+                    # line that fails to decode is dropped, never re-buffered
+                    print(f"[{_now()}] bad JSON line in {path}: {s[:80]!r}")
+                    continue
+                try:
+                    check_record(record, path, self.alerted_blocks, self._queue_alert)
+                except Exception:
+                    print(f"[{_now()}] error in check_record for {path}")
+                    traceback.print_exc()
+            self.flush_alerts(force=False)
 
     def on_created(self, event):
-        size = os.path.getsize(event.src_path) if os.path.exists(event.src_path) else 0
-        start = 0 if READ_NEW_FILES_FROM_START else size
-        self.offsets[event.src_path] = start; self.buffers[event.src_path] = ""
-        print(f"[{_now()}] NEW file {event.src_path} size={size} offset={start}")
-        if READ_NEW_FILES_FROM_START:
-            self._process_path(event.src_path)
+        with self._lock:
+            size = os.path.getsize(event.src_path) if os.path.exists(event.src_path) else 0
+            start = 0 if READ_NEW_FILES_FROM_START else size
+            self._close_fd(event.src_path)
+            self.offsets[event.src_path] = start; self.buffers[event.src_path] = bytearray()
+            print(f"[{_now()}] NEW file {event.src_path} size={size} offset={start}")
+            if READ_NEW_FILES_FROM_START:
+                self._process_path(event.src_path)
 
     def on_modified(self, event):
-        if event.src_path not in self.offsets:
-            size = os.path.getsize(event.src_path) if os.path.exists(event.src_path) else 0
-            self.offsets[event.src_path] = size; self.buffers[event.src_path] = ""
-            print(f"[{_now()}] late-register {event.src_path} size={size} offset={size}")
-        self._process_path(event.src_path)
+        with self._lock:
+            if event.src_path not in self.offsets:
+                size = os.path.getsize(event.src_path) if os.path.exists(event.src_path) else 0
+                self.offsets[event.src_path] = size; self.buffers[event.src_path] = bytearray()
+                print(f"[{_now()}] late-register {event.src_path} size={size} offset={size}")
+            self._process_path(event.src_path)
+
+    def on_moved(self, event):
+        with self._lock:
+            old, new = event.src_path, event.dest_path
+            if os.path.dirname(new) != self.focus_dir:
+                # Left the focus hour: finish tailing it, then forget it
+                self.on_deleted(event); return
+            self.offsets[new] = self.offsets.pop(old, 0)
+            self.buffers[new] = self.buffers.pop(old, bytearray())
+            fd = self._fds.pop(old, None)
+            if fd is not None:
+                self._close_fd(new)
+                self._fds[new] = fd
+            print(f"[{_now()}] moved {old} -> {new} carry_offset={self.offsets[new]}")
+
+    def on_deleted(self, event):
+        with self._lock:
+            # Lines appended before the unlink or rename are still readable
+            self._process_path(event.src_path)
+            self._close_fd(event.src_path)
+            self.offsets.pop(event.src_path, None); self.buffers.pop(event.src_path, None)
+
+class InotifyWatch:
+    """Raw inotify on a single directory, read from the main loop.
+
+    Stands in for watchdog's emitter and dispatch threads when only the focus
+    hour is watched: one read() returns a whole batch of events, repeated
+    modifies of a file collapse into one read of it, and nothing crosses a
+    thread. Linux only; construction fails elsewhere and the caller falls
+    back to watchdog.
+    """
+    IN_MODIFY, IN_MOVED_FROM, IN_MOVED_TO = 0x2, 0x40, 0x80
+    IN_CREATE, IN_DELETE, IN_Q_OVERFLOW, IN_ISDIR = 0x100, 0x200, 0x4000, 0x40000000
+    MASK = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    _EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch, self._rm_watch = libc.inotify_add_watch, libc.inotify_rm_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno(); raise OSError(err, os.strerror(err))
+        self.wd, self.dir = None, None
+
+    def watch(self, path: str):
+        """Watch path instead of the previous directory."""
+        if self.wd is not None:
+            self._rm_watch(self.fd, self.wd)
+        wd = self._add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno(); raise OSError(err, os.strerror(err), path)
+        self.wd, self.dir = wd, path
+
+    def dispatch_events(self, handler, timeout: float):
+        """Wait up to timeout for events and feed them to handler."""
+        if not select.select([self.fd], [], [], timeout)[0]: return
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        modified, off, size = {}, 0, self._EVENT.size
+        moved_from = {}  # cookie -> source path, paired with its IN_MOVED_TO
+        while off < len(data):
+            wd, mask, cookie, n = self._EVENT.unpack_from(data, off)
+            name = data[off + size:off + size + n].rstrip(b"\0")
+            off += size + n
+            if mask & self.IN_Q_OVERFLOW:
+                handler.poll(); continue
+            if wd != self.wd or mask & self.IN_ISDIR or not name: continue
+            path = os.path.join(self.dir, os.fsdecode(name))
+            if mask & self.IN_MOVED_TO and cookie in moved_from:
+                # Rename within the hour: same file, so offset, buffer and fd
+                # carry over instead of the file being re-read from the start
+                src = moved_from.pop(cookie)
+                if src in modified:
+                    del modified[src]; modified[path] = None
+                handler.dispatch(FileMovedEvent(src, path))
+            elif mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                handler.dispatch(FileCreatedEvent(path))
+            elif mask & self.IN_MOVED_FROM:
+                moved_from[cookie] = path
+            elif mask & self.IN_DELETE:
+                modified.pop(path, None)
+                handler.dispatch(FileDeletedEvent(path))
+            elif mask & self.IN_MODIFY:
+                modified[path] = None
+        for path in modified:
+            handler.dispatch(FileModifiedEvent(path))
+        # Renamed out of the hour; the deleted handler reads what is left
+        # through the still-open fd before forgetting the file
+        for path in moved_from.values():
+            handler.dispatch(FileDeletedEvent(path))
+
+    def close(self):
+        os.close(self.fd)
 
 if __name__ == "__main__":
     if not os.path.isdir(ROOT):
         print(f"[{_now()}] Not found: {ROOT}"); raise SystemExit(1)
-    print(f"[{_now()}] Monitoring recursively under: {ROOT}")
+    if WATCH_MODE not in ("inotify", "watchdog", "polling"):
+        print(f"[{_now()}] Unknown WATCH_MODE {WATCH_MODE!r}; use inotify, watchdog or polling"); raise SystemExit(1)
+    print(f"[{_now()}] Monitoring latest hour under: {ROOT}")
     if MARKETS:
         print(f"[{_now()}] Filtering for markets: {', '.join(sorted(MARKETS))}")
     else:
         print(f"[{_now()}] Monitoring all markets")
     handler = TailHandler(ROOT)
-    observer = Observer()
-    observer.schedule(handler, path=ROOT, recursive=True)
-    observer.start()
+    observer = watch = inotify = None
+    if WATCH_MODE == "polling":
+        print(f"[{_now()}] polling focus hour every {POLL_INTERVAL}s")
+    else:
+        if WATCH_MODE == "inotify":
+            try:
+                inotify = InotifyWatch()
+                if handler.focus_dir: inotify.watch(handler.focus_dir)
+            except (OSError, AttributeError) as e:
+                print(f"[{_now()}] inotify unavailable ({e}); using watchdog")
+                if inotify is not None: inotify.close(); inotify = None
+        if inotify is None:
+            observer = Observer()
+            # One non-recursive watch on the focus hour, moved on rollover,
+            # instead of inotify watches across the whole tree
+            watch = observer.schedule(handler, path=handler.focus_dir, recursive=False) if handler.focus_dir else None
+            observer.start()
     try:
-        while True: time.sleep(1)
+        now = time.monotonic()
+        next_recheck, next_poll = now + FOCUS_RECHECK_SECONDS, now
+        while True:
+            if inotify is not None and inotify.dir is not None:
+                # Blocks for at most the debounce window
+                inotify.dispatch_events(handler, ALERT_DEBOUNCE_SECONDS)
+            else:
+                time.sleep(ALERT_DEBOUNCE_SECONDS)
+            now = time.monotonic()
+            if WATCH_MODE == "polling" and now >= next_poll:
+                next_poll = now + POLL_INTERVAL
+                handler.poll()
+            handler.flush_alerts(force=False)
+            if now < next_recheck: continue
+            next_recheck = now + FOCUS_RECHECK_SECONDS
+            new_dir = handler.refocus()
+            if not new_dir: continue
+            if inotify is not None:
+                inotify.watch(new_dir)
+            elif observer is not None:
+                if watch is not None: observer.unschedule(watch)
+                watch = observer.schedule(handler, path=new_dir, recursive=False)
     except KeyboardInterrupt:
         send_developer_alert("stale_oracle_alerts.py: Stopped by user (Ctrl+C)")
-        print(f"[{_now()}] stopping"); observer.stop()
+        print(f"[{_now()}] stopping")
     except Exception as e:
         send_developer_alert(f"stale_oracle_alerts.py: Crashed with error: {e}")
-        print(f"[{_now()}] Fatal error: {e}"); observer.stop()
+        print(f"[{_now()}] Fatal error: {e}")
         raise
-    observer.join()
+    finally:
+        if observer is not None:
+            observer.stop(); observer.join()
+        if inotify is not None:
+            inotify.close()
+        handler.flush_alerts()
+        handler.close()